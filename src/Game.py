@@ -1,524 +1,199 @@
-import pygame, sys, os, random, math, copy, vector
-from pygame.locals import *
-
-WINDOW_WIDTH = 600
-WINDOW_HEIGHT = 600
-COLORKEY = (255,0,255)
-
-KEY_UP = pygame.K_UP
-KEY_DOWN = pygame.K_DOWN
-KEY_LEFT = pygame.K_LEFT
-KEY_RIGHT = pygame.K_RIGHT
-KEY_FLIP = pygame.K_SPACE
-
-PLAYER_RADIUS = 13
-PLAYER_ATTRACTRADIUS = 100
-PLAYER_FORCE = 200
-PLAYER_MAXSPEED = 200
-PLAYER_ACCELERATION = 600
-PLAYER_FRICTION = 200
-
-MAX_PARTICLES = 20
-MAT_COLOR = (255,0,0)
-ANTI_COLOR = (0,255,0)
-PARTICLE_RADIUS = 10
-PARTICLE_MAXSPEED = 250
-PARTICLE_ATTRACTRADIUS = 20
-PARTICLE_FORCE = 10
-PARTICLE_SPAWNRATE = 5
-
-MAX_ENEMIES = 10
-ENEMY_COLOR = (100, 20, 250)
-ENEMY_RADIUS = 5
-ENEMY_SPAWNRATE = 5
-
-EXPLOSION_MAXTIME = 2
-EXPLOSION_GROWTHRATE = 30
-EXPLOSION_COLOR = (255,82,30)
-
-TEXT_COLOR = (255,255,255)
-SCORE_POSITION = (25,25)
-
-class Particle:
-    def __init__(self, radius, maxSpeed, matter, attractRadius, force, color):
+import sys, time, random, argparse
+from settings import *
+from world import World, ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT, ACTION_FLIP, ACTION_RESET
+from scheduler import FixedStepScheduler
+from replay import Recorder
+from pipeline import Pipeline, BusyClock, PHYSICS, DRAWING
+import instrument
+
+# Key for each action, by pygame name as pygame isn't loaded until the game starts
+KEYS = (("K_UP", ACTION_UP), ("K_DOWN", ACTION_DOWN), ("K_LEFT", ACTION_LEFT), ("K_RIGHT", ACTION_RIGHT),
+        ("K_SPACE", ACTION_FLIP), ("K_a", ACTION_RESET))
+
+class Game:
+    def __init__(self, options, overrides=None):
         """
-        radius = radius of particle
-        maxSpeed = maximum speed of particle
-        matter = True if matter, False if antimatter
-        attractRadius = Radius at which will attract another polarity particle 
-        color = Color to draw particle """
-        self.radius = radius
-        self.maxSpeed = maxSpeed # NOT IMPLMENTED
-        self.matter = matter
-        self.position = [0,0]
-        self.speed = [0,0]
-        self.attractRadius = attractRadius
-        self.force = force;
-        self.color = color
-    
-    def update(self, sec):
+        The game in a window. Making one does next to nothing, pygame, the display,
+        the world and the fonts are only loaded once the game starts
+        options = Parsed command line, see parseArguments()
+        overrides = Dict of settings to change for the world, see World """
+        self.options = options
+        self.overrides = overrides
+        self.inst = instrument.fromOptions(options)
+        self.seed = options.seed
+        if self.seed is None:
+            self.seed = random.randrange(1 << 31)
+        self.world = None # Everything below is made by start()
+        self.scheduler = None
+        self.renderer = None
+        self.hud = None
+        self.recorder = None
+        self.pipeline = None # Runs the physics on its own thread with --pipelined
+        self.clock = None # Counts how long physics and drawing keep busy
+        self.games = 0 # New games the pipeline has started that the screen has been cleared for
+        self.actions = {} # key -> action
+        self.frames = 0 # Frames shown so far
+
+    def start(self):
         """
-        sec = Time since last update in seconds """
-        self.position[0] += self.speed[0] * sec # Move along x axis
-        self.position[1] += self.speed[1] * sec # Move along y axis
-        if(self.position[0] + self.radius > WINDOW_WIDTH or 
-           self.position[0] - self.radius < 0 or 
-           self.position[1] + self.radius > WINDOW_HEIGHT or
-           self.position[1] - self.radius < 0): # We are out of bounds, go back
-            self.bounce()
-        self.limitSpeed()
-            
-    
-    def draw(self, screen):
-        """
-        screen = Screen to draw onto """
-        
-        #pygame.draw.circle(screen, (0,255,255), self.position, self.attractRadius) # Draw attract radius (debug)
-        pygame.draw.circle(screen, self.color, (int(self.position[0]), int(self.position[1])), self.radius)
-        
-    def checkCollision(self, pos, radius, attractRadius):
-        """
-        Checks for collision within radius and attractRadius
-        returns 1 for radius collision, 0 for attractRadius collision, -1 for no collision
-        """
-        xdist = self.position[0] - pos[0]
-        ydist = self.position[1] - pos[1]
-        dist = (xdist ** 2 + ydist ** 2) ** 0.5
-        if dist <= (radius + self.radius):
-            return 1
-        if dist <= (attractRadius + self.attractRadius):
-            return 0
-        return -1
-    
-    def collide(self, part2, updateSelf=True):
-        part2.speed = self.bounce(part2.speed)
-    
-    def attract(self, part2, updateSelf=True):
-        xdist = self.position[0] - part2.position[0]
-        ydist = self.position[1] - part2.position[1]
-        dist = (xdist ** 2 + ydist ** 2) ** 0.5
-        force1 = self.force / dist # Strength of force moving part1
-        force2 = part2.force / dist # Strength of force moving part2
-        newPos = [part2.position[0] + (xdist / 2), part2.position[1] + (ydist / 2)] # Point to move towards
-        # Now find the normalised unit vector between the points and this one
-        vector1 = [(newPos[0] - self.position[0]) / dist, (newPos[1] - self.position[1]) / dist]
-        vector2 = [(newPos[0] - part2.position[0]) / dist, (newPos[1] - part2.position[1]) / dist]
-        # Modify speed for each particle
-        if updateSelf:
-            self.speed[0] += vector1[0] * force1
-            self.speed[1] += vector1[1] * force1
-        part2.speed[0] += vector2[0] * force2
-        part2.speed[1] += vector2[1] * force2
-
-    def bounce(self, speed=None):
-        """
-        If a speed is supplied, it does a more compelx calculation 
-        Returns None if no speed supplied or the modified speed if it is supplied """
-        self.speed[0] *= -1
-        self.speed[1] *= -1
-        if speed is not None:
-            avgx = (math.fabs(self.speed[0]) + math.fabs(speed[0])) / 2 # Average x and y velocities
-            avgy = (math.fabs(self.speed[1]) + math.fabs(speed[1])) / 2
-            self.speed[0] = math.copysign(avgx, self.speed[0])
-            self.speed[1] = math.copysign(avgy, self.speed[1])
-            speed[0] = math.copysign(avgx, speed[0] * -1)
-            speed[1] = math.copysign(avgy, speed[1] * -1)
-        
-        return speed
-    
-    def bounce2(self, p2):
-        """ More complicated bounce, should give better angles.
-        Takes in the particle it is bouncing against and updates its speed too """
-        
-        avgSpeed = vector.scale(vector.absAdd(self.speed, p2.speed), 0.5) # Average speed
-        # Find the normalised vector from p1 to p2
-        n = vector.unit(vector.subtract(self.position, p2.position))
-        
-        self.speed = vector.multiply(n, avgSpeed)
-        p2.speed = vector.scale(vector.multiply(n, avgSpeed), -1)
-        
-        self.limitSpeed()
-        p2.limitSpeed()
-        
-    def limitSpeed(self):
-        if self.speed[0] > self.maxSpeed: # Make sure speed is within limit
-            self.speed[0] = self.maxSpeed
-        if self.speed[0] < self.maxSpeed * -1:
-            self.speed[0] = self.maxSpeed * -1
-            
-        if self.speed[1] > self.maxSpeed:
-            self.speed[1] = self.maxSpeed
-        if self.speed[1] < self.maxSpeed * -1:
-            self.speed[1] = self.maxSpeed * -1
+        Opens the window and makes everything needed to play """
+        import pygame # Takes longer to load than everything else put together so wait until now
+        from render import Renderer
+        from hud import Hud
+        from camera import Camera
+        pygame.display.init() # Only the display is needed, fonts start themselves when first used
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        #playerSprite = getImage("player.bmp", COLORKEY)
+        self.actions = dict((getattr(pygame, name), action) for name, action in KEYS)
+        self.world = World(self.seed, self.overrides)
+        self.world.instrument = self.inst
+        self.hud = Hud()
+        self.scheduler = FixedStepScheduler(1.0 / PHYSICS_RATE, RENDER_FPS, MAX_CATCHUP_STEPS)
+        settings = self.world.settings
+        self.renderer = Renderer(screen, Camera(WINDOW_WIDTH, WINDOW_HEIGHT, settings.WORLD_WIDTH, settings.WORLD_HEIGHT))
+        if self.options.record:
+            self.recorder = Recorder(self.options.record, self.seed, self.scheduler.stepTime, self.scheduler.maxSteps, self.overrides)
+        self.clock = BusyClock()
+        if self.options.pipelined:
+            self.pipeline = Pipeline(self.world, self.scheduler.stepTime, self.scheduler.maxSteps, (WINDOW_WIDTH, WINDOW_HEIGHT), self.recorder, self.clock)
+            self.pipeline.start()
+
+    def resetGame(self): # World has already started the new game
+        self.renderer.invalidate() # Game over text is still on screen
+        print("Game reset")
+
+    def input(self, events): # Handles input
+        import pygame
+        for event in events:
+            if event.type == pygame.QUIT: # Quit event
+                if self.recorder is not None and self.pipeline is None: # The physics thread stops between frames
+                    self.recorder.quit()
+                sys.exit(0)
             
+            if event.type == pygame.KEYDOWN and event.key in self.actions:
+                action = self.actions[event.key]
+                if self.pipeline is not None:
+                    self.pipeline.press(action) # Recorded when the physics thread gets to it
+                    continue
+                if self.recorder is not None:
+                    self.recorder.press(action)
+                if self.world.press(action):
+                    self.resetGame()
             
-        
-class Player(Particle):
-    def __init__(self, radius, sprite, attractRadius, force, maxSpeed, acceleration, friction):
-        Particle.__init__(self, radius, maxSpeed, True, attractRadius, force, MAT_COLOR)
-        self.acceleration = acceleration
-        self.position = [200,200]
-        self.direction = [0,0]
-        self.radius = radius
-        self.sprite = sprite # Not used
-        self.alive = True
-        self.friction = friction
-
-    
-    """def draw(self, screen):
-        pygame.draw.circle(screen, self.color, self.position, self.attractRadius) # Draw attract radius
-        x, y = self.position
-        x -= self.radius
-        y -= self.radius
-        screen.blit(self.sprite, (x,y))"""
-        
-    def update(self, sec):
-        """
-        Updates player position etc
-        sec: Time in seconds since last update """
-        self.position[0] += self.speed[0] * sec
-        self.position[1] += self.speed[1] * sec
-        
-        self.speed[0] += self.direction[0] * (self.acceleration * sec) # Update speed with acceleration
-        self.speed[1] += self.direction[1] * (self.acceleration * sec)
-        
-        self.speed[0] -= math.copysign(self.friction * sec, self.speed[0]) # reduce friction
-        self.speed[1] -= math.copysign(self.friction * sec, self.speed[1])
-        
-        self.limitSpeed()
-        
-        if(self.position[0] + self.radius > WINDOW_WIDTH or 
-           self.position[0] - self.radius < 0 or 
-           self.position[1] + self.radius > WINDOW_HEIGHT or
-           self.position[1] - self.radius < 0): # We are out of bounds, go back
-            self.speed[0] *= -1
-            self.speed[1] *= -1 # TODO: Direction does different things in Player and Particle, could fix this
-        
-        
-    def flipPolarity(self):
-        """
-        Flips between matter and antimatter """
-        self.matter = not self.matter
-        if self.matter:
-            self.color = MAT_COLOR
-        else:
-            self.color = ANTI_COLOR
-    
-class ParticleManager:
-    def __init__(self, maxParticles, matColor, antiColor, radius, maxSpeed, attractRadius, force, player, spawnRate, explosionMan):
+            elif event.type == pygame.KEYUP and event.key in self.actions:
+                action = self.actions[event.key]
+                if self.pipeline is not None:
+                    self.pipeline.release(action)
+                    continue
+                if self.recorder is not None:
+                    self.recorder.release(action)
+                self.world.release(action)
+
+    def frame(self):
         """
-        maxParticles =  Maximum number of particles that can spawn
-        matColor = Color of matter
-        antiColor = Color of antimatter
-        radius = Radius for each particle
-        maxSpeed = Max speed for each particle
-        attractRadius = attractRadius for each particle
-        force = attraction force of particles
-        player = reference to the player
-        spawnRate = Rate at which particles spawn automatically
-        """
-        self.maxParticles = maxParticles
-        self.matColor = matColor
-        self.antiColor = antiColor
-        self.player = player
-        self.spawnRate = spawnRate
-        self.explosionMan = explosionMan
-        
-        self.aliveList = [] # List of particles currently alive
-        self.deadList = [] # List of all particles currently dead
-        self.lastSpawn = 0.0 # Time since last spawn
-
-        for i in range(maxParticles): # All particles start off dead so add them to dead list
-            matter = (i % 2 == 0) # Half matter, half antimatter
-            if matter:
-                color = matColor
-            else:
-                color = antiColor
-            part = Particle(radius, maxSpeed, matter, attractRadius, force, color)
-            self.deadList.append(part)
+        Handles input, runs the physics steps that are due and draws one frame """
+        import pygame
+        if self.pipeline is not None:
+            self.pipelinedFrame()
+            return
+        inst = self.inst
+        clock = self.clock
+        world = self.world
+        scheduler = self.scheduler
+        renderer = self.renderer
+        frameTime = scheduler.wait() # Sleeps if we are ahead of the frame cap
+        if self.recorder is not None:
+            self.recorder.frame(frameTime)
+        start = inst.start()
+        self.input(pygame.event.get()) # Get input
+        start = inst.stop("input", start)
+        if world.player.alive:
+            clock.start(PHYSICS)
+            stepStart = time.perf_counter()
+            steps = world.stepFrame(scheduler, frameTime)
+            self.hud.frame(frameTime, steps, time.perf_counter() - stepStart)
+            clock.stop(PHYSICS)
+            start = inst.stop("step", start)
             
-    def spawnParticle(self):
-        """ 
-        Spawns a particle if we aren't at the max limit. Particle is spawned at a random location
-        outside the range of any other particles or player and has no momentum
-        """
-        if len(self.deadList) > 0:
-            part = self.deadList.pop() # There are dead available so get a body to raise
-            top = part.radius + 1 # Highest it can spawn
-            left = part.radius + 1 # Most left it can spawn
-            right = WINDOW_WIDTH - part.radius  - 1 # Most right it can spawn
-            bot = WINDOW_HEIGHT - part.radius - 1 # Lowest it can spawn
-            spawnable = False # Will set to true when it is ok to spawn here
+            clock.start(DRAWING)
+            renderer.clear()
             
-            while not spawnable:
-                pos = [random.randint(left, right), random.randint(top, bot)] # Get a random location
-                spawnable = True # Be optimistic
-                
-                collide = player.checkCollision(pos, part.radius, part.attractRadius)
-                if collide >= 0:
-                    spawnable = False # Too close to player
-                    continue # Don't bother checking against other part, just roll again
-                
-                for alive in self.aliveList:
-                    collide = alive.checkCollision(pos, part.radius, part.attractRadius)
-                    if collide >= 0:
-                        spawnable = False
-                        break # We are in range of another particle so don't spawn here
-                
-            part.position = pos;
-            part.speed = [0,0]
-            self.aliveList.append(part)
-    
-    def spawnAll(self):
-        """
-        Turns all dead particles into living ones """
-        for i in range(len(self.deadList)):
-            self.spawnParticle()
-
-    def update(self, sec):
-        toDie = [] # List of particles which have to die when we finish
-        for i in range(len(self.aliveList)):
-            part1 = self.aliveList[i]
-            oldPos = copy.deepcopy(part1.position)
-            part1.update(sec)
-            for j in range(i+1, len(self.aliveList)): # Check all the ones after this particle for collision
-                part2 = self.aliveList[j]
-                collide = part1.checkCollision(part2.position, part2.radius, part2.attractRadius)
-                if collide == 1: # Full on collision
-                    if part1.matter == part2.matter: # Same stuff so just bounce
-                        #part1.collide(part2)
-                        part1.bounce2(part2)
-                        part1.position = oldPos
-                    else: # Uh oh... things are gonna blow up here
-                        toDie.append(i) # Marked for death
-                        toDie.append(j) # TODO: Implement explosions
-                        pos1 = self.aliveList[i].position
-                        pos2 = self.aliveList[j].position # Make explosion halfway between both
-                        epos = [pos1[0] - ((pos1[0] - pos2[0]) / 2), pos1[1] - ((pos1[1] - pos2[1]) / 2)]
-                        explosionMan.addExplosion(epos)
-                elif collide == 0 and part1.matter is not part2.matter: # Attract range and attractive (pretty little particles)
-                    part1.attract(part2)
-            
-            collide = part1.checkCollision(player.position, player.radius, player.attractRadius) # Check proximity to player
-            if collide == 1 and player.matter is not part1.matter: # Ru roh
-                player.alive = False
-            if collide == 0 and player.matter is not part1.matter:
-                player.attract(part1, False)
-        # Each time we remove one from alive, the counter drops
-        toDie.sort() # So if we sort it first, we can use an offset of i
-        for i in range(len(toDie)):
-            self.deadList.append(self.aliveList[toDie[i] - i])
-            del self.aliveList[toDie[i] - i]
-        # Now that we have tried to kill our particles, lets see if we can ressurect a few
-        if len(self.deadList) > 0:
-            self.lastSpawn += sec
-            if self.lastSpawn > self.spawnRate:
-                self.spawnParticle()
-                self.lastSpawn = 0.0
-    
-    def draw(self, screen):
-        for alive in self.aliveList:
-            alive.draw(screen)
-        
-class EnemyManager(ParticleManager):
-    def __init__(self, maxEnemies, color, radius, spawnRate, explosionMan):
+            renderer.drawWorld(world, scheduler.alpha())
+            self.hud.drawScore(renderer, world.score)
+        else:
+            clock.start(DRAWING)
+            self.hud.drawGameOver(renderer)
+        start = inst.stop("draw", start)
+     
+        renderer.present() # Update changes to screen
+        clock.stop(DRAWING)
+        inst.stop("display", start)
+        self.frames += 1
+
+    def pipelinedFrame(self):
         """
-        Pretty much just a modified ParticleManager with some values set to 0 """
-        ParticleManager.__init__(self, maxEnemies, color, color, radius, 0, 0, 0, player, spawnRate, explosionMan)
-       
-    def update(self, sec):
-        """ Returns the number of enemies destroyed this pass """
-        i = 0
-        offset = 0
-        limit = len(self.aliveList)
-        while i < limit: # Loop through alive enemies to see if any are getting blown up
-            e = self.aliveList[i - offset]
-            die = explosionMan.checkCollision(e.position, e.radius)
-            if die: # Bogey down
-                self.deadList.append(e)
-                del self.aliveList[i - offset]
-                offset += 1
-            i += 1
-        
-        if len(self.deadList) > 0: # Bring the little beggers back
-            self.lastSpawn += sec
-            if self.lastSpawn > self.spawnRate:
-                self.spawnParticle()
-                self.lastSpawn = 0
-        
-        return offset
-
-class Explosion:
-    def __init__(self, maxTime, growthRate, color, position):
-        self.maxTime = maxTime # Time in seconds to stay alive
-        self.growthRate = growthRate # Rate to grow per second
-        self.color = color
-        self.position = position
-        self.radius = 0.0 # Start with 0 radius
-        self.aliveTime = 0.0 # Only just born
-    
-    def update(self, sec):
+        Handles input and draws the newest tick the physics thread has finished, which
+        carries on with the next one meanwhile """
+        import pygame
+        inst = self.inst
+        renderer = self.renderer
+        frameTime = self.scheduler.wait() # Frame cap for drawing, the physics thread keeps its own time
+        start = inst.start()
+        self.input(pygame.event.get())
+        start = inst.stop("input", start)
+        state, steps, stepTime = self.pipeline.take()
+        self.hud.frame(frameTime, steps, stepTime)
+        if state.games != self.games:
+            self.games = state.games
+            self.resetGame()
+        self.clock.start(DRAWING)
+        if state.alive:
+            renderer.clear()
+            renderer.drawState(state, self.pipeline.alpha(state))
+            self.hud.drawScore(renderer, state.score)
+        else:
+            self.hud.drawGameOver(renderer)
+        start = inst.stop("draw", start)
+        renderer.present()
+        self.clock.stop(DRAWING)
+        inst.stop("display", start)
+        self.frames += 1
+
+    def run(self, maxFrames=0):
         """
-        Returns True if still alive, False if time is up """
-        self.aliveTime += sec
-        if self.aliveTime >= self.maxTime:
-            return False
-        self.radius += self.growthRate * sec
-        return True
-    
-    def draw(self, screen):
-        pygame.draw.circle(screen, self.color, (int(self.position[0]), int(self.position[1])), int(self.radius))
-        
-class ExplosionManager:
-    def __init__(self, maxTime, growthRate, color):
-        self.active = [] # All active explosions (none to start)
-        self.maxTime = maxTime
-        self.growthRate = growthRate
-        self.color = color
-        
-    def addExplosion(self, position):
-        expl = Explosion(self.maxTime, self.growthRate, self.color, position)
-        self.active.append(expl) # TODO: Maybe best to keep a record of dead explosions and use them instead of creating new every time
-    
-    def update(self, sec):
-        i = 0
-        offset = 0 # number removed, have to offset list by
-        size = len(self.active) # Don't use for loop because we need index and offset
-        while i < size:
-            alive = self.active[i - offset].update(sec)
-            if not alive:
-                del self.active[i - offset]
-                offset += 1
-            i += 1
-    
-    def draw(self, screen):
-        for exp in self.active:
-            exp.draw(screen)
-    
-    def checkCollision(self, pos, radius):
-        """ Checks to see if any explosions are within this range 
-        Returns True if there is a collision, False if not """
-        for exp in self.active:
-            x1, y1 = exp.position
-            x2, y2 = pos
-            dist = ((x1 - x2) ** 2 + (y2 - y1) ** 2)
-            if dist < (radius + exp.radius) ** 2: # Squaring is less intensive than sqrt
-                return True # Balls are touching
-        return False
-
-
-def resetGame():
-    player.__init__(PLAYER_RADIUS , None, PLAYER_ATTRACTRADIUS, PLAYER_FORCE, PLAYER_MAXSPEED, PLAYER_ACCELERATION, PLAYER_FRICTION)
-    particleMan.__init__(MAX_PARTICLES, MAT_COLOR, ANTI_COLOR, PARTICLE_RADIUS, PARTICLE_MAXSPEED, PARTICLE_ATTRACTRADIUS, PARTICLE_FORCE, player, PARTICLE_SPAWNRATE, explosionMan)
-    particleMan.spawnAll()
-    enemyMan.__init__(MAX_ENEMIES, ENEMY_COLOR, ENEMY_RADIUS, ENEMY_SPAWNRATE, explosionMan)
-    enemyMan.spawnAll()
-    explosionMan.__init__(EXPLOSION_MAXTIME, EXPLOSION_GROWTHRATE, EXPLOSION_COLOR)
-    global score
-    score = 0
-    print "Game reset" # TODO: Reset not working, can prob just use __init__()
-               
-def input(events): # Handles input
-    moveDir = player.direction # Direction to move player based on input
-    for event in events:
-        if event.type == QUIT: # Quit event
-            sys.exit(0)
-        
-        if event.type == KEYDOWN:
-            if player.alive:
-                if event.key == KEY_UP:
-                    moveDir[1] -= 1
-                elif event.key == KEY_DOWN:
-                    moveDir[1] += 1
-                elif event.key == KEY_LEFT:
-                    moveDir[0] -= 1
-                elif event.key == KEY_RIGHT:
-                    moveDir[0] += 1
-                elif event.key == KEY_FLIP:
-                    player.flipPolarity()
-                elif event.key == pygame.K_a:
-                    resetGame()
-            else:
-                if event.key == KEY_FLIP:
-                    resetGame()
-        
-        elif event.type == KEYUP:
-            if player.alive:
-                if event.key == KEY_UP:
-                    moveDir[1] += 1
-                elif event.key == KEY_DOWN:
-                    moveDir[1] -= 1
-                elif event.key == KEY_LEFT:
-                    moveDir[0] += 1
-                elif event.key == KEY_RIGHT:
-                    moveDir[0] -= 1
-
-def loadImage(name, colorkey):
-    """
-    Loads an image from the res folder with the specified name and with the specified colorkey """
-    
-    fullname = os.path.join('res', name) # Create full name of file so it includes the res folder
+        Starts the game if it hasn't been yet and plays until the window is closed
+        maxFrames = Stop after this many frames, 0 to keep going """
+        if self.world is None:
+            self.start()
+        while maxFrames == 0 or self.frames < maxFrames: # main loop
+            self.frame()
+
+    def close(self):
+        if self.pipeline is not None:
+            self.pipeline.stop() # Before the recorder closes under it
+        if self.clock is not None and self.clock.frames > 0:
+            print(self.clock.report())
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+            print("Input saved to " + self.options.record)
+
+def parseArguments(args=None):
+    parser = argparse.ArgumentParser(description="Antimatter")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed, picked at random if not given")
+    parser.add_argument("--record", metavar="FILE", help="Record input and frame times to FILE to play back with replay.py")
+    parser.add_argument("--frames", type=int, default=0, help="Quit after this many frames, eg to time startup")
+    parser.add_argument("--pipelined", action="store_true", default=PIPELINED, help="Run the physics on its own thread while the last tick is drawn")
+    instrument.addArguments(parser)
+    return parser.parse_args(args)
+
+def main(args=None):
+    options = parseArguments(args)
+    game = Game(options)
     try:
-        image = pygame.image.load(fullname) # Try and load the image
-    except pygame.error, message:
-        print "Cannot load image ", name
-        raise SystemExit, message # If it can't load image, gtfo
-    
-    image = image.convert() # Set the image to the same format as dispaly so it is drawn quickly
-    image.set_colorkey(colorkey, RLEACCEL)
-    return image
-
-        
-pygame.init(); # initialise pygame
-window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-screen = pygame.display.get_surface()
-updateRate = 50 # ms between updates
-#playerSprite = loadImage("player.bmp", COLORKEY)
-explosionMan = ExplosionManager(EXPLOSION_MAXTIME, EXPLOSION_GROWTHRATE, EXPLOSION_COLOR)
-player = Player(PLAYER_RADIUS , None, PLAYER_ATTRACTRADIUS, PLAYER_FORCE, PLAYER_MAXSPEED, PLAYER_ACCELERATION, PLAYER_FRICTION)
-particleMan = ParticleManager(MAX_PARTICLES, MAT_COLOR, ANTI_COLOR, PARTICLE_RADIUS, PARTICLE_MAXSPEED, PARTICLE_ATTRACTRADIUS, PARTICLE_FORCE, player, PARTICLE_SPAWNRATE, explosionMan)
-particleMan.spawnAll()
-enemyMan = EnemyManager(MAX_ENEMIES, ENEMY_COLOR, ENEMY_RADIUS, ENEMY_SPAWNRATE, explosionMan)
-enemyMan.spawnAll()
-
-gameOverFont = pygame.font.Font(None, 76) # Default font 76 size
-gameOverText = gameOverFont.render("GAME OVER", 1, TEXT_COLOR)
-gameOverTextPos = gameOverText.get_rect()
-gameOverTextPos.centerx = (WINDOW_WIDTH / 2)
-gameOverTextPos.centery = (WINDOW_HEIGHT / 2)
-
-scoreFont = pygame.font.Font(None, 36)
-score = 0
-
-resetText = scoreFont.render("<Press Space or A to reset>", 1, TEXT_COLOR)
-resetTextPos = resetText.get_rect()
-resetTextPos.centerx = gameOverTextPos.centerx
-resetTextPos.centery = gameOverTextPos.centery + gameOverTextPos.height
-
-clock = pygame.time.Clock()
-
-while 1: # main loop
+        instrument.runWithOptions(lambda: game.run(options.frames), game.inst, options)
+    finally:
+        game.close()
 
-    input(pygame.event.get()) # Get input
-    if player.alive:
-        ms = clock.tick_busy_loop() # Time since last update in ms
-        secs = ms / 1000.0 # Time in seconds
-        player.update(secs)
-        particleMan.update(secs)
-        explosionMan.update(secs)
-        score += enemyMan.update(secs)
-        
-        screen.fill((0,0,0))
-        
-        explosionMan.draw(screen)
-        player.draw(screen)
-        enemyMan.draw(screen)
-        particleMan.draw(screen)
-        scoreString = "Score: " + str(score)
-        scoreText = scoreFont.render(scoreString, 1, TEXT_COLOR)
-        screen.blit(scoreText, SCORE_POSITION)
-    else:
-        screen.blit(gameOverText, gameOverTextPos) # Game over, show death screen
-        screen.blit(resetText, resetTextPos)
- 
-    pygame.display.flip() # Update changes to screen
+if __name__ == '__main__':
+    main()
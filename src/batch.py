@@ -0,0 +1,104 @@
+import sys, ast, time, json, argparse, itertools, multiprocessing
+from settings import *
+from world import World
+
+def runOne(job):
+    """
+    Plays one headless game until the player dies or maxTicks is reached
+    job = (runId, seed, overrides, maxTicks, dt, snapshot), snapshot is None for a new game
+    or bytes from World.save() to fork the run from, seed then picks how it carries on
+    Returns a dict of how it went """
+    runId, seed, overrides, maxTicks, dt, snapshot = job
+    start = time.time()
+    world = World(seed, overrides)
+    if snapshot is not None:
+        world.load(snapshot, False)
+    maxTicks += world.ticks # Count ticks from the snapshot
+    while world.ticks < maxTicks and world.step(dt):
+        pass
+    return {"run": runId,
+            "seed": seed,
+            "overrides": overrides,
+            "score": world.score,
+            "survivalTime": world.time,
+            "annihilations": world.explosionMan.started,
+            "ticks": world.ticks,
+            "alive": world.player.alive,
+            "seconds": time.time() - start}
+
+def makeJobs(sweeps, runs, seed, maxTicks, dt, snapshot=None):
+    """
+    Makes a job for every combination of the swept settings, each repeated runs times
+    with a different seed
+    sweeps = List of (name, [values])
+    snapshot = World.save() bytes every run starts from, None for new games """
+    names = [name for name, values in sweeps]
+    jobs = []
+    for combo in itertools.product(*[values for name, values in sweeps]):
+        overrides = dict(zip(names, combo))
+        for i in range(runs):
+            jobs.append((len(jobs), seed + i, overrides, maxTicks, dt, snapshot))
+    return jobs
+
+def runBatch(jobs, processes=None):
+    """
+    Runs the jobs spread across a pool of processes, one world per job
+    processes = Number of processes, None for one per core
+    Yields each result as soon as its run finishes, in whatever order they finish """
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(runOne, jobs, chunksize=1):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+def parseSweep(text):
+    """ Turns NAME=1,2,3 into ("NAME", [1, 2, 3]) """
+    name, values = text.split("=", 1)
+    return (name, [ast.literal_eval(value) for value in values.split(",")])
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs lots of seeded headless games across all cores")
+    parser.add_argument("--runs", type=int, default=10, help="Runs of each combination of settings")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the first run, the rest count up from it")
+    parser.add_argument("--ticks", type=int, default=PHYSICS_RATE * 300, help="Most ticks to run each game for")
+    parser.add_argument("--dt", type=float, default=1.0 / PHYSICS_RATE, help="Seconds per tick")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=V1,V2",
+                        help="Setting to try each value of, can be given more than once")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes, one per core by default")
+    parser.add_argument("--out", metavar="FILE", help="Append each result to FILE as a line of JSON")
+    parser.add_argument("--start", metavar="FILE", help="Fork every run from a snapshot saved with world.py --save")
+    options = parser.parse_args(args)
+    if options.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    sweeps = [parseSweep(text) for text in options.set]
+    snapshot = None
+    if options.start:
+        snapshot = open(options.start, "rb").read()
+    jobs = makeJobs(sweeps, options.runs, options.seed, options.ticks, options.dt, snapshot)
+    world = World(0, jobs[0][2]) # Fail now on a bad setting name or snapshot rather than in every worker
+    if snapshot is not None:
+        world.load(snapshot)
+    out = None
+    if options.out:
+        out = open(options.out, "a")
+    start = time.time()
+    ticks = 0
+    try:
+        for result in runBatch(jobs, options.processes):
+            ticks += result["ticks"]
+            line = json.dumps(result, sort_keys=True)
+            print(line)
+            if out is not None:
+                out.write(line + "\n")
+                out.flush()
+    finally:
+        if out is not None:
+            out.close()
+    taken = time.time() - start
+    sys.stderr.write("%d runs, %d ticks in %.2fs (%.0f ticks/sec)\n" % (len(jobs), ticks, taken, ticks / max(taken, 1e-9)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,588 @@
+import os, sys, time, json, random, platform, argparse, subprocess, tracemalloc
+import vector
+from settings import *
+from entities import *
+from world import World
+
+now = time.perf_counter_ns
+
+# Most seconds startup may take at p50. This is the startup check: python benchmark.py --startup
+# runs Game in fresh interpreters with no real window and exits with 1 if either is missed
+STARTUP_TARGETS = {"startup.import": 0.25, "startup.firstFrame": 1.0}
+
+# Run in a new interpreter each time so nothing has been imported yet
+STARTUP_SCRIPT = """
+import time, json
+start = time.perf_counter_ns()
+import Game
+imported = time.perf_counter_ns()
+Game.Game(Game.parseArguments(["--seed", "1"])).run(1)
+print(json.dumps([imported - start, time.perf_counter_ns() - start]))
+"""
+
+class Scene:
+    def __init__(self, particles, enemies, explosions, size, seed, moving=1.0):
+        """
+        A seeded arena with particles, enemies and explosions to time things against
+        particles = Number of particles
+        enemies = Number of enemies
+        explosions = Number of explosions already going off
+        size = Width and height of the arena, big scenes need more room to spawn into
+        seed = Seed for random
+        moving = Fraction of the particles to start moving, the rest sit still where they spawned """
+        random.seed(seed)
+        self.rng = random.Random(seed)
+        self.size = size
+        self.particles = particles
+        self.enemies = enemies
+        self.explosions = explosions
+        self.explosionMan = ExplosionManager(EXPLOSION_MAXTIME, EXPLOSION_GROWTHRATE, EXPLOSION_COLOR)
+        self.player = Player(PLAYER_RADIUS , None, PLAYER_ATTRACTRADIUS, PLAYER_FORCE, PLAYER_MAXSPEED, PLAYER_ACCELERATION, PLAYER_FRICTION, size, size, MAT_COLOR, ANTI_COLOR)
+        self.player.position.set(size / 2.0, size / 2.0)
+        self.player.lastPosition.set(size / 2.0, size / 2.0)
+        self.particleMan = self.newParticleManager()
+        self.particleMan.spawnAll()
+        for part in self.particleMan.aliveList[:int(len(self.particleMan.aliveList) * moving)]: # Get them moving so they actually bump into each other
+            part.speed.set(self.rng.uniform(-PARTICLE_MAXSPEED, PARTICLE_MAXSPEED), self.rng.uniform(-PARTICLE_MAXSPEED, PARTICLE_MAXSPEED))
+        self.enemyMan = EnemyManager(enemies, ENEMY_COLOR, ENEMY_RADIUS, ENEMY_SPAWNRATE, self.player, self.explosionMan, size, size, self.rng)
+        self.enemyMan.spawnAll()
+        for i in range(explosions): # Part way through their lives so they have some size
+            expl = self.explosionMan.addExplosion([self.rng.uniform(0, size), self.rng.uniform(0, size)])
+            expl.update(self.rng.uniform(0, EXPLOSION_MAXTIME * 0.9))
+        self.explosionMan.update(0.0) # Start them all going
+
+    def newParticleManager(self):
+        return ParticleManager(self.particles, MAT_COLOR, ANTI_COLOR, PARTICLE_RADIUS, PARTICLE_MAXSPEED, PARTICLE_ATTRACTRADIUS, PARTICLE_FORCE, self.player, PARTICLE_SPAWNRATE, self.explosionMan, self.size, self.size, self.rng)
+
+class Timings:
+    def __init__(self):
+        """ Per call times in ns for each benchmark """
+        self.samples = {}
+        self.peaks = {} # name -> peak bytes allocated while it ran
+        self.base = 0 # Bytes allocated before the timed part started
+
+    def begin(self):
+        """ Call once the scene is built so its memory isn't counted in the peak """
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self.base = tracemalloc.get_traced_memory()[0]
+
+    def add(self, name, ns):
+        self.samples.setdefault(name, []).append(ns)
+
+    def summary(self, name):
+        ordered = sorted(self.samples[name])
+        total = sum(ordered)
+        pick = lambda p: ordered[min(int(len(ordered) * p / 100.0), len(ordered) - 1)] / 1000.0
+        return {"calls": len(ordered),
+                "totalSeconds": total / 1e9,
+                "perSecond": len(ordered) / max(total / 1e9, 1e-12),
+                "meanUs": total / 1000.0 / len(ordered),
+                "p50Us": pick(50), "p95Us": pick(95), "p99Us": pick(99), "maxUs": ordered[-1] / 1000.0,
+                "peakBytes": self.peaks.get(name, 0)}
+
+def timeParticles(scene, timings, ticks, dt, name="particleMan.update"):
+    man = scene.particleMan
+    timings.begin()
+    for i in range(ticks):
+        start = now()
+        man.update(dt)
+        timings.add(name, now() - start)
+
+def timeEnemies(scene, timings, ticks, dt):
+    man = scene.enemyMan
+    alive = list(man.aliveList)
+    timings.begin()
+    for i in range(ticks): # Put the same enemies back each time so every call does the same work
+        man.setAlive(alive, [])
+        start = now()
+        man.update(dt)
+        timings.add("enemyMan.update", now() - start)
+
+def timeExplosions(scene, timings, ticks):
+    man = scene.explosionMan
+    positions = [e.position for e in scene.enemyMan.aliveList]
+    radii = [e.radius for e in scene.enemyMan.aliveList]
+    timings.begin()
+    for i in range(ticks):
+        for pos in positions:
+            start = now()
+            man.checkCollision(pos, ENEMY_RADIUS)
+            timings.add("explosionMan.checkCollision", now() - start)
+        start = now()
+        man.checkCollisions(positions, radii)
+        timings.add("explosionMan.checkCollisions", now() - start)
+
+def timeSpawn(scene, timings, repeats):
+    timings.begin()
+    for i in range(repeats):
+        man = scene.newParticleManager()
+        start = now()
+        man.spawnAll()
+        timings.add("particleMan.spawnAll", now() - start)
+
+def timeAnnihilation(timings, repeats, count):
+    """
+    Times the tick where count particles all annihilate at once, the worst spike a game gets """
+    pairs = max(count // 2, 1)
+    columns = int(pairs ** 0.5) + 1
+    size = columns * 60 + 200 # Pairs far enough apart to leave each other alone
+    for r in range(repeats):
+        explosionMan = ExplosionManager(EXPLOSION_MAXTIME, EXPLOSION_GROWTHRATE, EXPLOSION_COLOR)
+        player = Player(PLAYER_RADIUS , None, PLAYER_ATTRACTRADIUS, PLAYER_FORCE, PLAYER_MAXSPEED, PLAYER_ACCELERATION, PLAYER_FRICTION, size, size, MAT_COLOR, ANTI_COLOR)
+        player.position.set(size - 20, size - 20) # Out of the way
+        player.lastPosition.set(size - 20, size - 20)
+        man = ParticleManager(pairs * 2, MAT_COLOR, ANTI_COLOR, PARTICLE_RADIUS, PARTICLE_MAXSPEED, PARTICLE_ATTRACTRADIUS, PARTICLE_FORCE, player, PARTICLE_SPAWNRATE, explosionMan, size, size)
+        matter = [part for part in man.particles if part.matter]
+        anti = [part for part in man.particles if not part.matter]
+        for i in range(pairs): # Each pair just about touching and heading for each other
+            x = 50 + (i % columns) * 60
+            y = 50 + (i // columns) * 60
+            for part, px, speed in ((matter[i], x, 50), (anti[i], x + PARTICLE_RADIUS * 2 + 0.5, -50)):
+                part.position.set(px, y)
+                part.lastPosition.set(px, y)
+                part.speed.set(speed, 0)
+        man.setAlive(man.particles, [])
+        timings.begin()
+        start = now()
+        man.update(1.0 / PHYSICS_RATE)
+        timings.add("particleMan.annihilate", now() - start)
+
+def timeVector(timings, repeats, batch=1000):
+    """ Vector functions are timed in batches of calls as one call is too quick to time alone """
+    a = [3.0, -4.0]
+    b = [-1.5, 2.5]
+    va = vector.Vec2(3.0, -4.0)
+    vb = vector.Vec2(-1.5, 2.5)
+    calls = (("add", vector.add, (a, b)), ("subtract", vector.subtract, (a, b)), ("unit", vector.unit, (a,)),
+             ("multiply", vector.multiply, (a, b)), ("scale", vector.scale, (a, 0.5)), ("dot", vector.dot, (a, b)),
+             ("absAdd", vector.absAdd, (a, b)), ("Vec2.add", vector.Vec2.__add__, (va, vb)),
+             ("Vec2.iadd", vector.Vec2.__iadd__, (va, vb)), ("Vec2.dot", vector.Vec2.dot, (va, vb)))
+    loop = range(batch)
+    timings.begin()
+    for name, func, args in calls:
+        for i in range(repeats):
+            start = now()
+            for j in loop:
+                func(*args)
+            timings.add("vector." + name, (now() - start) // batch)
+
+def timeWorld(timings, ticks, dt, seed):
+    world = World(seed)
+    timings.begin()
+    for i in range(ticks):
+        start = now()
+        if not world.step(dt):
+            world.reset()
+        timings.add("world.step", now() - start)
+
+def bigWorld(options, farStep):
+    """
+    Returns a World as big as the scene arena with all its particles moving, so most
+    of it is off screen """
+    world = World(options.seed, {"WORLD_WIDTH": options.size, "WORLD_HEIGHT": options.size,
+                                 "MAX_PARTICLES": options.particles, "FAR_STEP": farStep})
+    rng = random.Random(options.seed)
+    for part in world.particleMan.aliveList:
+        part.speed.set(rng.uniform(-PARTICLE_MAXSPEED, PARTICLE_MAXSPEED), rng.uniform(-PARTICLE_MAXSPEED, PARTICLE_MAXSPEED))
+    return world
+
+def timeBigWorld(timings, ticks, dt, options, farStep, name):
+    world = bigWorld(options, farStep)
+    timings.begin()
+    for i in range(ticks):
+        start = now()
+        if not world.step(dt):
+            world.player.alive = True # Keep going, it's the particles being timed
+        timings.add(name, now() - start)
+
+def timeRender(timings, ticks, dt, options):
+    """
+    Draws a big world through a window sized camera that follows the player around """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed to time drawing into one
+    import pygame
+    from render import Renderer
+    from camera import Camera
+    pygame.display.init()
+    try:
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        world = bigWorld(options, 1)
+        renderer = Renderer(screen, Camera(WINDOW_WIDTH, WINDOW_HEIGHT, options.size, options.size))
+        timings.begin()
+        for i in range(ticks):
+            world.player.direction[0] = (i // 100) % 2 * 2 - 1 # Wander back and forth so the camera moves
+            if not world.step(dt):
+                world.player.alive = True
+            start = now()
+            renderer.clear()
+            renderer.drawWorld(world)
+            renderer.present()
+            timings.add("render.drawWorld", now() - start)
+    finally:
+        pygame.display.quit()
+
+def timeSnapshot(timings, repeats, seed):
+    world = World(seed)
+    for i in range(PHYSICS_RATE * 10): # Get some explosions and dead particles going
+        if not world.step(1.0 / PHYSICS_RATE):
+            world.reset()
+    data = world.save()
+    timings.begin()
+    for i in range(repeats):
+        start = now()
+        world.save()
+        timings.add("world.save", now() - start)
+        start = now()
+        world.load(data)
+        timings.add("world.load", now() - start)
+        start = now()
+        world.reset()
+        timings.add("world.reset", now() - start)
+        world.load(data)
+
+def timeStartup(timings, repeats):
+    """
+    Times importing Game and getting the first frame on screen, with no real window """
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    here = os.path.dirname(os.path.abspath(__file__))
+    for i in range(repeats):
+        out = subprocess.check_output([sys.executable, "-c", STARTUP_SCRIPT], env=env, cwd=here)
+        imported, first = json.loads(out.decode().splitlines()[-1])
+        timings.add("startup.import", imported)
+        timings.add("startup.firstFrame", first)
+
+def checkStartup(results, targets=STARTUP_TARGETS):
+    """
+    Prints how startup did against its targets
+    Returns the names that took too long """
+    slow = []
+    for name in sorted(targets):
+        if name not in results["results"]:
+            continue
+        taken = results["results"][name]["p50Us"] / 1e6
+        flag = ""
+        if taken > targets[name]:
+            flag = "  TOO SLOW"
+            slow.append(name)
+        print("%-30s p50 %8.3fs target %8.3fs%s" % (name, taken, targets[name], flag))
+    return slow
+
+def entityMemory(count):
+    """
+    Returns {kind: bytes} of how much memory each particle, enemy and explosion takes, found
+    by making count of each in a manager and giving them all their own position and speed """
+    def moveAll(parts):
+        for i in range(len(parts)): # Every particle in a running game has its own numbers
+            part = parts[i]
+            part.position[0] = i + 0.25
+            part.position[1] = i + 0.5
+            part.lastPosition[0] = i + 0.75
+            part.lastPosition[1] = i + 1.25
+            part.speed[0] = i + 1.5
+            part.speed[1] = i + 1.75
+
+    sizes = {}
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        man = ParticleManager(count, MAT_COLOR, ANTI_COLOR, PARTICLE_RADIUS, PARTICLE_MAXSPEED, PARTICLE_ATTRACTRADIUS, PARTICLE_FORCE, None, PARTICLE_SPAWNRATE, None, WORLD_WIDTH, WORLD_HEIGHT)
+        moveAll(man.particles)
+        sizes["particle"] = (tracemalloc.get_traced_memory()[0] - base) / float(count)
+        del man
+
+        base = tracemalloc.get_traced_memory()[0]
+        man = EnemyManager(count, ENEMY_COLOR, ENEMY_RADIUS, ENEMY_SPAWNRATE, None, None, WORLD_WIDTH, WORLD_HEIGHT)
+        moveAll(man.particles)
+        sizes["enemy"] = (tracemalloc.get_traced_memory()[0] - base) / float(count)
+        del man
+
+        base = tracemalloc.get_traced_memory()[0]
+        man = ExplosionManager(EXPLOSION_MAXTIME, EXPLOSION_GROWTHRATE, EXPLOSION_COLOR)
+        for i in range(count):
+            man.addExplosion([i + 0.25, i + 0.5]).update(i * 1e-6) # Some age and size of its own
+        man.update(0.0)
+        sizes["explosion"] = (tracemalloc.get_traced_memory()[0] - base) / float(count)
+        del man
+    finally:
+        tracemalloc.stop()
+    return sizes
+
+def checkTunnelling(dts, trials, seed):
+    """
+    Fires particles at full speed at each other, at the player and at the edges, stepping
+    by each of dts, and counts the ones that get through without touching
+    trials = Shots of each sort for each step length
+    Returns {dt: (pairs missed, player missed, edges crossed)} """
+    rng = random.Random(seed)
+    size = 4000 # Plenty of room to fly off into once they've missed
+    middle = size / 2.0
+    missed = {}
+    for dt in dts:
+        pairs = shots = edges = 0
+        for i in range(trials):
+            explosionMan = ExplosionManager(EXPLOSION_MAXTIME, EXPLOSION_GROWTHRATE, EXPLOSION_COLOR)
+            player = Player(PLAYER_RADIUS , None, PLAYER_ATTRACTRADIUS, PLAYER_FORCE, PLAYER_MAXSPEED, PLAYER_ACCELERATION, PLAYER_FRICTION, size, size, MAT_COLOR, ANTI_COLOR)
+            player.position.set(100, 100) # Out of the way
+            player.lastPosition.set(100, 100)
+            man = ParticleManager(2, MAT_COLOR, ANTI_COLOR, PARTICLE_RADIUS, PARTICLE_MAXSPEED, PARTICLE_ATTRACTRADIUS, PARTICLE_FORCE, player, PARTICLE_SPAWNRATE, explosionMan, size, size)
+            matter, anti = man.particles # Straight at each other, off centre by up to most of a radius
+            man.setAlive([matter, anti], [])
+            offset = rng.uniform(-1.5, 1.5) * PARTICLE_RADIUS
+            for part, x, y, speed in ((matter, middle - 200, middle, PARTICLE_MAXSPEED), (anti, middle + 200, middle + offset, -PARTICLE_MAXSPEED)):
+                part.position.set(x, y)
+                part.lastPosition.set(x, y)
+                part.speed.set(speed, 0)
+            for tick in range(int(1.5 / dt)):
+                man.update(dt)
+            if explosionMan.started == 0:
+                pairs += 1
+
+            player.position.set(middle, middle) # At the player, just the antimatter one this time
+            player.lastPosition.set(middle, middle)
+            player.friction = 0 # Friction on its own makes it creep off with longer steps
+            anti.position.set(middle - 300, middle + rng.uniform(-1.5, 1.5) * PARTICLE_RADIUS)
+            anti.lastPosition.set(anti.position.x, anti.position.y)
+            anti.speed.set(PARTICLE_MAXSPEED, 0)
+            man.setAlive([anti], [])
+            for tick in range(int(2.0 / dt)):
+                player.update(dt)
+                man.update(dt)
+            if player.alive:
+                shots += 1
+
+            anti.position.set(size - 100, middle) # At the edge
+            anti.speed.set(PARTICLE_MAXSPEED, rng.uniform(-PARTICLE_MAXSPEED, PARTICLE_MAXSPEED))
+            for tick in range(int(1.0 / dt)):
+                anti.update(dt)
+                if anti.position.x + PARTICLE_RADIUS > size + 1e-6:
+                    edges += 1
+                    break
+        missed[dt] = (pairs, shots, edges)
+    return missed
+
+def comparePipeline(options, frames):
+    """
+    Plays the game for frames frames with the serial loop then with the physics on its own
+    thread, in a big world with no window, and prints how much of each frame overlapped """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame, Game
+    overrides = {"WORLD_WIDTH": options.size, "WORLD_HEIGHT": options.size, "MAX_PARTICLES": options.particles,
+                 "MAX_ENEMIES": options.enemies}
+    for name, args in (("serial", []), ("pipelined", ["--pipelined"])):
+        game = Game.Game(Game.parseArguments(["--seed", str(options.seed)] + args), overrides)
+        try:
+            start = time.perf_counter()
+            game.run(frames)
+            taken = time.perf_counter() - start
+        finally:
+            if game.pipeline is not None:
+                game.pipeline.stop()
+            pygame.display.quit()
+        clock = game.clock
+        print("%-10s %5.1f fps %s" % (name, frames / taken, clock.report()))
+
+def loadTest(options, clients, seconds):
+    """
+    Starts server.py in another process with clients connected to it over localhost, all
+    reading every frame and now and then pressing keys, and prints the bandwidth used and
+    how long frames took from leaving the server to being read. One client decodes
+    everything to make sure the frames still make sense under load """
+    import socket, selectors, signal, net
+    from replay import KIND_PRESS, KIND_RELEASE
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, "server.py", "--port", "0", "--seed", str(options.seed),
+               "--set", "WORLD_WIDTH=%d" % options.size, "--set", "WORLD_HEIGHT=%d" % options.size,
+               "--set", "MAX_PARTICLES=%d" % options.particles, "--set", "MAX_ENEMIES=%d" % options.enemies]
+    proc = subprocess.Popen(command, cwd=here, stdout=subprocess.PIPE, universal_newlines=True)
+    try:
+        host, port = proc.stdout.readline().split()[-1].rsplit(":", 1)
+        selector = selectors.DefaultSelector()
+        socks = []
+        for i in range(clients):
+            sock = socket.create_connection((host, int(port)))
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ, (i, net.MessageReader()))
+            socks.append(sock)
+        rng = random.Random(options.seed)
+        received = [0] * clients
+        frames = [0] * clients
+        latencies = []
+        mirror = None
+        start = time.time()
+        end = start + seconds
+        while time.time() < end:
+            for key, events in selector.select(0.05):
+                i, reader = key.data
+                data = key.fileobj.recv(262144)
+                if len(data) == 0:
+                    raise RuntimeError("Server hung up on client %d" % i)
+                received[i] += len(data)
+                arrived = time.time()
+                for kind, payload in reader.feed(data):
+                    if kind == net.MSG_HELLO:
+                        if i == 0:
+                            mirror = net.Mirror(payload)
+                        continue
+                    if i == 0:
+                        mirror.apply(kind, payload)
+                    frames[i] += 1
+                    latencies.append(arrived - net.FRAME.unpack_from(payload, 0)[1])
+                if rng.random() < 0.01: # About one key every two seconds each
+                    key.fileobj.sendall(net.inputMessage(rng.choice((KIND_PRESS, KIND_RELEASE)), rng.randrange(5))) # Moves and flip, which also starts a new game
+        taken = time.time() - start
+        for sock in socks:
+            sock.close()
+        proc.send_signal(signal.SIGINT)
+        serverReport = proc.communicate()[0].strip()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    latencies.sort()
+    def at(p):
+        return latencies[min(int(len(latencies) * p / 100.0), len(latencies) - 1)] * 1000
+    total = sum(received) / 1024.0 / taken
+    print("%d client(s) for %.1fs, %d particles and %d enemies in %dx%d" % (clients, taken, options.particles, options.enemies, options.size, options.size))
+    print("  %.1f frames/s and %.2f KiB/s each, %.1f KiB/s in all" % (sum(frames) / float(clients) / taken, total / clients, total))
+    print("  latency p50 %.2fms p95 %.2fms p99 %.2fms max %.2fms" % (at(50), at(95), at(99), latencies[-1] * 1000))
+    print("  client 0 has %d particles, %d enemies and %d explosions" % (len(mirror.sections[net.PARTICLES]), len(mirror.sections[net.ENEMIES]), len(mirror.sections[net.EXPLOSIONS])))
+    print("  " + serverReport.splitlines()[-1])
+
+def run(options):
+    """ Runs every benchmark, returns the results ready to save as JSON """
+    dt = 1.0 / PHYSICS_RATE
+    def scene(moving=1.0):
+        return Scene(options.particles, options.enemies, options.explosions, options.size, options.seed, moving)
+
+    benches = (("particleMan.update", lambda t, n: timeParticles(scene(), t, n, dt)),
+               ("particleMan.idle", lambda t, n: timeParticles(scene(0.1), t, n, dt, "particleMan.idle")),
+               ("enemyMan.update", lambda t, n: timeEnemies(scene(), t, n, dt)),
+               ("explosionMan.checkCollision", lambda t, n: timeExplosions(scene(), t, n)),
+               ("particleMan.annihilate", lambda t, n: timeAnnihilation(t, max(n // 50, 3), options.particles)),
+               ("particleMan.spawnAll", lambda t, n: timeSpawn(scene(), t, max(n // 50, 3))),
+               ("vector", lambda t, n: timeVector(t, max(n // 10, 5))),
+               ("world.step", lambda t, n: timeWorld(t, n, dt, options.seed)),
+               ("world.big", lambda t, n: timeBigWorld(t, n, dt, options, 1, "world.big")),
+               ("world.far", lambda t, n: timeBigWorld(t, n, dt, options, 4, "world.far")),
+               ("render.drawWorld", lambda t, n: timeRender(t, n, dt, options)),
+               ("world.save", lambda t, n: timeSnapshot(t, n, options.seed)),
+               ("startup", lambda t, n: timeStartup(t, max(n // 100, 3))))
+
+    timings = Timings()
+    for name, bench in benches:
+        if options.only and not name.startswith(options.only):
+            continue
+        bench(timings, options.ticks)
+        if name == "startup":
+            continue # Runs in other processes so there is no memory here to measure
+        # Run a short second pass to find peak memory, tracemalloc slows everything down too much to time with
+        memory = Timings()
+        tracemalloc.start()
+        bench(memory, max(options.ticks // 10, 1))
+        peak = tracemalloc.get_traced_memory()[1] - memory.base
+        tracemalloc.stop()
+        for sampled in memory.samples:
+            timings.peaks[sampled] = peak
+
+    memory = {}
+    if not options.only or "memory".startswith(options.only):
+        memory = entityMemory(options.entities)
+    return {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                     "seed": options.seed, "particles": options.particles, "enemies": options.enemies,
+                     "explosions": options.explosions, "size": options.size, "ticks": options.ticks,
+                     "time": time.strftime("%Y-%m-%d %H:%M:%S")},
+            "results": dict((name, timings.summary(name)) for name in sorted(timings.samples)),
+            "memory": memory}
+
+def compare(results, baseline, threshold):
+    """
+    Prints how each result changed from baseline
+    Returns the names that got slower by more than threshold (0.1 = 10%) """
+    slower = []
+    for name in sorted(results["results"]):
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        new = results["results"][name]
+        change = new["p50Us"] / max(old["p50Us"], 1e-9) - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            slower.append(name)
+        print("%-30s p50 %10.2fus -> %10.2fus %+7.1f%%%s" % (name, old["p50Us"], new["p50Us"], change * 100, flag))
+    for kind in sorted(results.get("memory", {})):
+        old = baseline.get("memory", {}).get(kind)
+        if old is None:
+            continue
+        new = results["memory"][kind]
+        change = new / max(old, 1e-9) - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            slower.append("memory." + kind)
+        print("%-30s %10.1fB  -> %10.1fB  %+7.1f%%%s" % ("memory." + kind, old, new, change * 100, flag))
+    return slower
+
+def report(results):
+    meta = results["meta"]
+    print("%d particles, %d enemies, %d explosions in %dx%d, seed %d" % (meta["particles"], meta["enemies"], meta["explosions"], meta["size"], meta["size"], meta["seed"]))
+    print("%-30s %12s %10s %10s %10s %12s" % ("", "calls/sec", "p50 us", "p95 us", "p99 us", "peak KiB"))
+    for name in sorted(results["results"]):
+        r = results["results"][name]
+        print("%-30s %12.0f %10.2f %10.2f %10.2f %12.1f" % (name, r["perSecond"], r["p50Us"], r["p95Us"], r["p99Us"], r["peakBytes"] / 1024.0))
+    for kind in sorted(results.get("memory", {})):
+        print("%-30s %10.1f bytes each" % ("memory." + kind, results["memory"][kind]))
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Times the simulation hot paths on a seeded scene")
+    parser.add_argument("--particles", type=int, default=200, help="Particles in the scene")
+    parser.add_argument("--enemies", type=int, default=50, help="Enemies in the scene")
+    parser.add_argument("--explosions", type=int, default=100, help="Explosions going off in the scene")
+    parser.add_argument("--size", type=int, default=1200, help="Width and height of the arena")
+    parser.add_argument("--entities", type=int, default=20000, help="Entities of each kind to measure memory with")
+    parser.add_argument("--ticks", type=int, default=500, help="Ticks (or calls) to time each benchmark for")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--only", help="Only run benchmarks starting with this name")
+    parser.add_argument("--out", metavar="FILE", help="Save the results as JSON to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against results saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown in p50 that counts as a regression")
+    parser.add_argument("--startup", action="store_true", help="Only time startup and fail if it misses its targets")
+    parser.add_argument("--tunnelling", type=int, metavar="SHOTS", help="Only count fast collisions missed with longer steps")
+    parser.add_argument("--pipeline", type=int, metavar="FRAMES", help="Only compare how much of a frame overlaps with and without --pipelined")
+    parser.add_argument("--net", type=int, metavar="CLIENTS", help="Only load test server.py with this many clients on localhost")
+    options = parser.parse_args(args)
+    if options.net:
+        loadTest(options, options.net, options.ticks / float(PHYSICS_RATE))
+        return 0
+    if options.pipeline:
+        comparePipeline(options, options.pipeline)
+        return 0
+    if options.tunnelling:
+        print("%-10s %12s %12s %12s" % ("step", "pairs", "player", "edges"))
+        for dt, (pairs, shots, edges) in sorted(checkTunnelling((1.0 / PHYSICS_RATE, 0.05, 0.1, 0.2, 0.5), options.tunnelling, options.seed).items()):
+            print("%-10s %5d missed %5d missed %5d crossed" % ("%.3fs" % dt, pairs, shots, edges))
+        return 0
+    if options.startup:
+        options.only = "startup"
+
+    results = run(options)
+    report(results)
+    if options.out:
+        out = open(options.out, "w")
+        try:
+            json.dump(results, out, indent=2, sort_keys=True)
+        finally:
+            out.close()
+    failed = False
+    if options.startup and checkStartup(results):
+        failed = True
+    if options.compare:
+        baseline = json.load(open(options.compare))
+        if compare(results, baseline, options.threshold):
+            failed = True
+    if failed:
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+class Camera:
+    def __init__(self, width, height, worldWidth, worldHeight):
+        """
+        The part of the world shown on screen. World coordinates go from (0, 0) to
+        (worldWidth, worldHeight), screen coordinates are world ones less (left, top)
+        width, height = Size of the screen
+        worldWidth, worldHeight = Size of the whole arena, can be many times the screen """
+        self.width = width
+        self.height = height
+        self.worldWidth = worldWidth
+        self.worldHeight = worldHeight
+        self.left = 0 # World position of the top left of the screen, whole pixels so nothing wobbles
+        self.top = 0
+
+    def follow(self, x, y):
+        """
+        Centres the screen on (x, y) without showing past the edges of the world """
+        self.left = int(max(min(x - self.width // 2, self.worldWidth - self.width), 0))
+        self.top = int(max(min(y - self.height // 2, self.worldHeight - self.height), 0))
+
+    def view(self):
+        """ Returns (left, top, right, bot) of the world on screen """
+        return (self.left, self.top, self.left + self.width, self.top + self.height)
+
+    def sees(self, x, y, radius):
+        """ Returns True if any of the circle is on screen """
+        return (x + radius > self.left and x - radius < self.left + self.width and
+                y + radius > self.top and y - radius < self.top + self.height)
+
+    def toScreen(self, x, y):
+        return (x - self.left, y - self.top)
@@ -0,0 +1,141 @@
+import sys, time, socket, argparse
+import net
+from settings import *
+from scheduler import FixedStepScheduler
+from replay import KIND_PRESS, KIND_RELEASE
+from pipeline import RenderState
+from Game import KEYS
+
+class Client:
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT):
+        """
+        A window onto a game run by server.py. Keys are sent to the server and whatever it
+        sends back is drawn the same way Game draws its own world
+        host, port = Server to connect to """
+        self.host = host
+        self.port = port
+        self.sock = None # Everything below is made by start()
+        self.reader = net.MessageReader()
+        self.mirror = None
+        self.state = RenderState()
+        self.arrived = 0.0 # When the newest frame came in
+        self.changed = False # Frames have come in since state was last filled
+        self.scheduler = None
+        self.renderer = None
+        self.hud = None
+        self.actions = {} # key -> action
+        self.games = 0 # New games the screen has been cleared for
+        self.frames = 0
+
+    def start(self):
+        """
+        Connects, waits to hear from the server, then opens the window
+        Raises ValueError if it isn't an Antimatter server """
+        import pygame
+        from render import Renderer
+        from hud import Hud
+        from camera import Camera
+        self.sock = socket.create_connection((self.host, self.port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while self.mirror is None:
+            data = self.sock.recv(65536)
+            if len(data) == 0:
+                raise ValueError("Server closed the connection")
+            for kind, payload in self.reader.feed(data):
+                self.receive(kind, payload)
+        self.sock.setblocking(False)
+        pygame.display.init()
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("Antimatter - %s:%d" % (self.host, self.port))
+        self.actions = dict((getattr(pygame, name), action) for name, action in KEYS)
+        self.scheduler = FixedStepScheduler(self.mirror.stepTime, RENDER_FPS) # Only for the frame cap
+        self.renderer = Renderer(screen, Camera(WINDOW_WIDTH, WINDOW_HEIGHT, self.mirror.width, self.mirror.height))
+        self.hud = Hud(False) # No physics time to show, that's on the server
+
+    def receive(self, kind, payload):
+        if kind == net.MSG_HELLO:
+            self.mirror = net.Mirror(payload)
+        elif self.mirror is not None and self.mirror.apply(kind, payload):
+            self.arrived = time.perf_counter()
+            self.changed = True
+
+    def pump(self):
+        """
+        Reads whatever the server has sent
+        Returns False once it has gone """
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return True
+            if len(data) == 0:
+                return False
+            for kind, payload in self.reader.feed(data):
+                self.receive(kind, payload)
+
+    def input(self, events):
+        import pygame
+        for event in events:
+            if event.type == pygame.QUIT:
+                sys.exit(0)
+            if event.type == pygame.KEYDOWN and event.key in self.actions:
+                self.sock.sendall(net.inputMessage(KIND_PRESS, self.actions[event.key]))
+            elif event.type == pygame.KEYUP and event.key in self.actions:
+                self.sock.sendall(net.inputMessage(KIND_RELEASE, self.actions[event.key]))
+
+    def frame(self):
+        """
+        Sends input, reads frames and draws the newest one part way to the next """
+        import pygame
+        renderer = self.renderer
+        self.scheduler.wait()
+        self.input(pygame.event.get())
+        if not self.pump():
+            print("Server closed the connection")
+            sys.exit(1)
+        state = self.state
+        if self.changed:
+            self.mirror.fill(state, self.arrived)
+            self.changed = False
+        if not self.mirror.synced:
+            return
+        if state.games != self.games:
+            self.games = state.games
+            renderer.invalidate() # Game over text is still on screen
+        if state.alive:
+            alpha = max(min((time.perf_counter() - state.captured) / self.mirror.stepTime, 1.0), 0.0)
+            renderer.clear()
+            renderer.drawState(state, alpha)
+            self.hud.drawScore(renderer, state.score)
+        else:
+            self.hud.drawGameOver(renderer)
+        renderer.present()
+        self.frames += 1
+
+    def run(self, maxFrames=0):
+        """
+        maxFrames = Stop after this many frames, 0 to keep going """
+        if self.sock is None:
+            self.start()
+        while maxFrames == 0 or self.frames < maxFrames:
+            self.frame()
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Plays a game run by server.py")
+    parser.add_argument("--host", default=SERVER_HOST, help="Server address")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Server port")
+    parser.add_argument("--frames", type=int, default=0, help="Quit after this many frames")
+    options = parser.parse_args(args)
+    client = Client(options.host, options.port)
+    try:
+        client.run(options.frames)
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,862 @@
+import random, math, spatial
+from settings import *
+from vector import Vec2
+from store import EntityStore
+
+def drawCircle(screen, color, pos, radius):
+    """
+    Draws a filled circle. pygame is only imported the first time something is drawn,
+    so worlds that never get drawn don't have to wait for it to load """
+    import pygame
+    pygame.draw.circle(screen, color, pos, radius)
+
+def timeOfImpact(x, y, dx, dy, reach, parting=True):
+    """
+    Finds when two moving circles first touch during a step, so fast ones can't jump
+    straight through each other between checks
+    x, y = Where the first circle starts relative to the second
+    dx, dy = How far the first circle moves relative to the second over the step
+    reach = Distance apart they touch at, the sum of their radii
+    parting = True to let circles already touching go if they are moving apart, eg ones
+    that have just bounced. False if touching at all counts, eg for opposites
+    Returns the fraction of the step they touch at, 0 if already touching, None if they
+    don't touch this step """
+    b = x * dx + y * dy # Half the rate the squared distance changes at
+    c = x * x + y * y - reach * reach
+    if c <= 0: # Already touching
+        if b < 0 or not parting:
+            return 0.0
+        return None
+    if b >= 0: # Moving apart or not at all
+        return None
+    a = dx * dx + dy * dy
+    disc = b * b - a * c
+    if disc < 0: # Passes by without touching
+        return None
+    t = (-b - disc ** 0.5) / a
+    if t > 1.0:
+        return None
+    return t
+
+class ParticleKind:
+    __slots__ = ('radius', 'maxSpeed', 'attractRadius', 'force', 'matColor', 'antiColor', 'width', 'height')
+
+    def __init__(self, radius, maxSpeed, attractRadius, force, matColor, antiColor, width, height):
+        """
+        Tuning shared by every particle of one sort, so each particle only holds its own state
+        radius = radius of particle
+        maxSpeed = maximum speed of particle
+        attractRadius = Radius at which will attract another polarity particle
+        force = Attraction force
+        matColor = Color to draw matter
+        antiColor = Color to draw antimatter
+        width, height = Size of the world to bounce around in """
+        self.radius = radius
+        self.maxSpeed = maxSpeed
+        self.attractRadius = attractRadius
+        self.force = force
+        self.matColor = matColor
+        self.antiColor = antiColor
+        self.width = width
+        self.height = height
+
+class Particle:
+    __slots__ = ('kind', 'matter', 'position', 'lastPosition', 'speed', 'asleep', 'behind')
+
+    def __init__(self, kind, matter):
+        """
+        kind = ParticleKind with the size, speed and colors of this sort of particle
+        matter = True if matter, False if antimatter """
+        self.kind = kind
+        self.matter = matter
+        self.position = Vec2(0.0, 0.0)
+        self.lastPosition = Vec2(0.0, 0.0) # Position before the last update, for drawing in between
+        self.speed = Vec2(0.0, 0.0)
+        self.asleep = False # Not moved or checked until something comes near, see ParticleManager.sleep()
+        self.behind = 0.0 # Seconds not simulated yet while far from the player, see ParticleManager.farStep
+
+    # Shared values live on the kind, these are for reading them from outside
+    radius = property(lambda self: self.kind.radius)
+    maxSpeed = property(lambda self: self.kind.maxSpeed)
+    attractRadius = property(lambda self: self.kind.attractRadius)
+    force = property(lambda self: self.kind.force)
+
+    @property
+    def color(self):
+        if self.matter:
+            return self.kind.matColor
+        return self.kind.antiColor
+
+    def update(self, sec):
+        """
+        sec = Time since last update in seconds """
+        pos = self.position
+        self.lastPosition.x = pos.x
+        self.lastPosition.y = pos.y
+        self.move(sec)
+        self.limitSpeed()
+
+    def move(self, sec):
+        """
+        Moves by speed for sec seconds. If an edge is touched on the way it bounces off
+        from there, rather than from wherever the whole step would have taken it
+        Returns True if it bounced """
+        pos = self.position
+        speed = self.speed
+        kind = self.kind
+        radius = kind.radius
+        dx = speed.x * sec
+        dy = speed.y * sec
+        t = 1.0 # Fraction of the step before touching an edge
+        if dx > 0 and pos.x + dx + radius > kind.width:
+            t = min(t, (kind.width - radius - pos.x) / dx)
+        elif dx < 0 and pos.x + dx - radius < 0:
+            t = min(t, (radius - pos.x) / dx)
+        if dy > 0 and pos.y + dy + radius > kind.height:
+            t = min(t, (kind.height - radius - pos.y) / dy)
+        elif dy < 0 and pos.y + dy - radius < 0:
+            t = min(t, (radius - pos.y) / dy)
+        if t >= 1.0:
+            pos.x += dx
+            pos.y += dy
+            return False
+        t = max(t, 0.0) # Already over the edge
+        pos.x += dx * t
+        pos.y += dy * t
+        self.bounce() # We hit the edge, go back for the rest of the step
+        pos.x += speed.x * sec * (1.0 - t)
+        pos.y += speed.y * sec * (1.0 - t)
+        return True
+            
+    
+    def draw(self, screen, alpha=1.0, camera=None):
+        """
+        screen = Screen to draw onto
+        alpha = How far from lastPosition to position to draw, 1 draws at position
+        camera = Camera the screen shows the world through, None if the screen is the whole world """
+        
+        #pygame.draw.circle(screen, (0,255,255), self.position, self.attractRadius) # Draw attract radius (debug)
+        x, y, radius, color = self.circle(alpha)
+        if camera is not None:
+            if not camera.sees(x, y, radius):
+                return
+            x, y = camera.toScreen(x, y)
+        drawCircle(screen, color, (x, y), radius)
+
+    def circle(self, alpha=1.0):
+        """
+        Returns (x, y, radius, color) of the circle to draw for this particle """
+        last = self.lastPosition
+        x = last.x + (self.position.x - last.x) * alpha
+        y = last.y + (self.position.y - last.y) * alpha
+        return (int(x), int(y), self.kind.radius, self.color)
+
+    def motion(self):
+        """
+        Returns (lastX, lastY, x, y, radius, color), enough to work out circle() for any alpha later """
+        last = self.lastPosition
+        pos = self.position
+        return (last.x, last.y, pos.x, pos.y, self.kind.radius, self.color)
+        
+    def checkCollision(self, pos, radius, attractRadius):
+        """
+        Checks for collision within radius and attractRadius
+        pos = Vec2 position of the other circle
+        returns 1 for radius collision, 0 for attractRadius collision, -1 for no collision
+        """
+        xdist = self.position.x - pos.x
+        ydist = self.position.y - pos.y
+        dist = (xdist ** 2 + ydist ** 2) ** 0.5
+        kind = self.kind
+        if dist <= (radius + kind.radius):
+            return 1
+        if dist <= (attractRadius + kind.attractRadius):
+            return 0
+        return -1
+    
+    def collide(self, part2, updateSelf=True):
+        part2.speed = self.bounce(part2.speed)
+    
+    def attract(self, part2, updateSelf=True):
+        pos1 = self.position
+        pos2 = part2.position
+        xdist = pos1.x - pos2.x
+        ydist = pos1.y - pos2.y
+        dist = (xdist ** 2 + ydist ** 2) ** 0.5
+        force1 = self.kind.force / dist # Strength of force moving part1
+        force2 = part2.kind.force / dist # Strength of force moving part2
+        newx = pos2.x + (xdist / 2) # Point to move towards
+        newy = pos2.y + (ydist / 2)
+        # Modify speed for each particle by the normalised unit vector between the points and this one
+        if updateSelf:
+            self.speed.x += (newx - pos1.x) / dist * force1
+            self.speed.y += (newy - pos1.y) / dist * force1
+        part2.speed.x += (newx - pos2.x) / dist * force2
+        part2.speed.y += (newy - pos2.y) / dist * force2
+
+    def bounce(self, speed=None):
+        """
+        If a speed is supplied, it does a more compelx calculation 
+        Returns None if no speed supplied or the modified speed if it is supplied """
+        s = self.speed
+        s.x *= -1
+        s.y *= -1
+        if speed is not None:
+            avgx = (math.fabs(s.x) + math.fabs(speed[0])) / 2 # Average x and y velocities
+            avgy = (math.fabs(s.y) + math.fabs(speed[1])) / 2
+            s.x = math.copysign(avgx, s.x)
+            s.y = math.copysign(avgy, s.y)
+            speed[0] = math.copysign(avgx, speed[0] * -1)
+            speed[1] = math.copysign(avgy, speed[1] * -1)
+        
+        return speed
+    
+    def bounce2(self, p2, nx=None, ny=None):
+        """ More complicated bounce, should give better angles.
+        Takes in the particle it is bouncing against and updates its speed too
+        nx, ny = Vector from p2 to this particle where they touched, their positions now if not given """
+        
+        # Worked out in place, this runs for every collision so making vectors here adds up
+        s1 = self.speed
+        s2 = p2.speed
+        avgx = (math.fabs(s1.x) + math.fabs(s2.x)) * 0.5 # Average speed
+        avgy = (math.fabs(s1.y) + math.fabs(s2.y)) * 0.5
+        # Find the normalised vector from p1 to p2
+        if nx is None:
+            nx = self.position.x - p2.position.x
+            ny = self.position.y - p2.position.y
+        dist = (nx ** 2 + ny ** 2) ** 0.5
+        nx = nx / dist
+        ny = ny / dist
+        
+        s1.x = nx * avgx
+        s1.y = ny * avgy
+        s2.x = -(nx * avgx)
+        s2.y = -(ny * avgy)
+        
+        self.limitSpeed()
+        p2.limitSpeed()
+        
+    def limitSpeed(self):
+        s = self.speed
+        maxSpeed = self.kind.maxSpeed
+        if s.x > maxSpeed: # Make sure speed is within limit
+            s.x = maxSpeed
+        if s.x < maxSpeed * -1:
+            s.x = maxSpeed * -1
+            
+        if s.y > maxSpeed:
+            s.y = maxSpeed
+        if s.y < maxSpeed * -1:
+            s.y = maxSpeed * -1
+            
+            
+        
+class Player(Particle):
+    __slots__ = ('acceleration', 'direction', 'sprite', 'alive', 'friction')
+
+    def __init__(self, radius, sprite, attractRadius, force, maxSpeed, acceleration, friction, width, height, matColor, antiColor):
+        """
+        width, height = Size of the world to move around in
+        matColor, antiColor = Color as matter and as antimatter """
+        Particle.__init__(self, ParticleKind(radius, maxSpeed, attractRadius, force, matColor, antiColor, width, height), True)
+        self.acceleration = acceleration
+        self.position.set(200, 200)
+        self.lastPosition.set(200, 200)
+        self.direction = [0,0]
+        self.sprite = sprite # Not used
+        self.alive = True
+        self.friction = friction
+
+    
+    """def draw(self, screen):
+        pygame.draw.circle(screen, self.color, self.position, self.attractRadius) # Draw attract radius
+        x, y = self.position
+        x -= self.radius
+        y -= self.radius
+        screen.blit(self.sprite, (x,y))"""
+        
+    def update(self, sec):
+        """
+        Updates player position etc
+        sec: Time in seconds since last update """
+        pos = self.position
+        speed = self.speed
+        self.lastPosition.x = pos.x
+        self.lastPosition.y = pos.y
+        self.move(sec) # TODO: Direction does different things in Player and Particle, could fix this
+        
+        speed.x += self.direction[0] * (self.acceleration * sec) # Update speed with acceleration
+        speed.y += self.direction[1] * (self.acceleration * sec)
+        
+        speed.x -= math.copysign(self.friction * sec, speed.x) # reduce friction
+        speed.y -= math.copysign(self.friction * sec, speed.y)
+        
+        self.limitSpeed()
+        
+        
+    def flipPolarity(self):
+        """
+        Flips between matter and antimatter, the color goes with it """
+        self.matter = not self.matter
+    
+class ParticleManager:
+    def __init__(self, maxParticles, matColor, antiColor, radius, maxSpeed, attractRadius, force, player, spawnRate, explosionMan, width, height, rng=None):
+        """
+        maxParticles =  Maximum number of particles that can spawn
+        matColor = Color of matter
+        antiColor = Color of antimatter
+        radius = Radius for each particle
+        maxSpeed = Max speed for each particle
+        attractRadius = attractRadius for each particle
+        force = attraction force of particles
+        player = reference to the player
+        spawnRate = Rate at which particles spawn automatically
+        explosionMan = reference to the explosion manager
+        width = Width of the world to spawn and bounce around in
+        height = Height of the world to spawn and bounce around in
+        rng = random.Random to spawn with, the random module if not given
+        """
+        self.maxParticles = maxParticles
+        self.matColor = matColor
+        self.antiColor = antiColor
+        self.player = player
+        self.spawnRate = spawnRate
+        self.explosionMan = explosionMan
+        self.rng = rng or random
+        self.width = width
+        self.height = height
+        
+        self.particles = [] # Every particle, alive or dead, in the order they were made
+        self.alive = EntityStore() # Particles currently alive
+        self.aliveList = self.alive.items # The same particles as a list, read it but change it through self.alive
+        self.deadList = [] # List of all particles currently dead
+        self.lastSpawn = 0.0 # Time since last spawn
+        self.useSpatialHash = PARTICLE_SPATIALHASH # Only check pairs in neighbouring cells
+        self.grid = spatial.SpatialHash(radius + attractRadius)
+        self.pairReach = 2 * max(radius, attractRadius) # Furthest apart two particles can still interact
+        self.pairChecks = 0 # Pairs checked for collision, for instrumentation
+        self.spawnRetries = 0 # Random spots tried when spawning, for instrumentation
+        self.spawnSamples = SPAWN_SAMPLES # Random spots to try before mapping out the free space
+        self.spawnTries = SPAWN_TRIES # Random spots to try once no space is completely free
+        self.useSleep = PARTICLE_SLEEP # Skip particles that have stopped with nothing near them
+        self.sleepSpeed = PARTICLE_SLEEPSPEED
+        self.sleepCheck = PARTICLE_SLEEPCHECK # Ticks between looking for particles to put to sleep
+        self.sleepers = spatial.SpatialHash(self.pairReach) # Handles of sleeping particles, by where they stopped
+        self.sleeping = 0 # Number of particles asleep
+        self.awakeCount = 0 # Awake particles are kept at the front of aliveList, sleeping ones after them
+        self.awake = 0 # Particles updated last tick, for instrumentation
+        self.sleepTicks = 0 # Ticks since we last looked for particles to put to sleep
+        self.farStep = 1 # Particles far from the player are only moved every this many ticks, 1 moves everything every tick
+        self.nearWidth = width # Particles further than this from the player across or down count as far
+        self.nearHeight = height
+        self.farTick = 0 # Which far particles are due to move, they take turns so it's spread over the ticks
+
+        self.kind = ParticleKind(radius, maxSpeed, attractRadius, force, matColor, antiColor, width, height)
+        for i in range(maxParticles): # All particles start off dead so add them to dead list
+            part = Particle(self.kind, i % 2 == 0) # Half matter, half antimatter
+            self.particles.append(part)
+            self.deadList.append(part)
+            
+    def spawnParticle(self):
+        """ 
+        Spawns a particle if we aren't at the max limit. Particle is spawned at a random location
+        outside the range of any other particles or player and has no momentum
+        Returns True if one was spawned, False if there are none dead or no room right now
+        """
+        return self.spawnParticles(1) > 0
+
+    def spawnParticles(self, count):
+        """
+        Spawns up to count dead particles in one pass, each one is kept clear of the
+        ones spawned before it. Gives up early if there is no room left
+        Returns the number spawned """
+        count = min(count, len(self.deadList))
+        if count == 0:
+            return 0
+        kind = self.kind # Every particle here is the same size
+        top = kind.radius + 1 # Highest it can spawn
+        left = kind.radius + 1 # Most left it can spawn
+        right = int(self.width) - kind.radius  - 1 # Most right it can spawn
+        bot = int(self.height) - kind.radius - 1 # Lowest it can spawn
+        reach = max(kind.radius * 2, kind.attractRadius * 2) # Must be further than this from another particle
+        grid = spatial.SpawnGrid(left, top, right, bot, kind.radius, self.rng)
+        player = self.player # Too close to player
+        grid.block(player.position, max(kind.radius + player.kind.radius, kind.attractRadius + player.kind.attractRadius))
+        for alive in self.aliveList: # Anything in range of another particle is out
+            grid.block(alive.position, max(kind.radius + alive.kind.radius, kind.attractRadius + alive.kind.attractRadius))
+
+        spawned = 0
+        while spawned < count:
+            pos = grid.find(self.spawnTries, self.spawnSamples)
+            if pos is None:
+                break # No room, try again later
+            part = self.deadList.pop() # There are dead available so get a body to raise
+            part.position.set(pos[0], pos[1])
+            part.lastPosition.set(pos[0], pos[1])
+            part.speed.set(0, 0)
+            part.behind = 0.0
+            self.alive.add(part)
+            self.alive.swap(len(self.alive) - 1, self.awakeCount) # In front of any sleepers
+            self.awakeCount += 1
+            grid.block(pos, reach)
+            spawned += 1
+        self.spawnRetries += grid.retries
+        return spawned
+    
+    def spawnAll(self):
+        """
+        Turns all dead particles into living ones, or as many as there is room for """
+        self.spawnParticles(len(self.deadList))
+
+    def setAlive(self, alive, dead):
+        """
+        Makes exactly these particles alive, in this order, without spawning them. For
+        setting up a game, eg from a snapshot. Particles marked asleep stay asleep and go
+        after the awake ones, which keeps the order of a list taken from aliveList
+        alive = Particles to be alive
+        dead = Every other particle, in the order they will be spawned from last to first """
+        living = self.alive
+        living.clear()
+        self.sleepers.clear()
+        for part in alive:
+            if not part.asleep:
+                living.add(part)
+        self.awakeCount = len(living)
+        for part in alive:
+            if part.asleep:
+                handle = living.add(part)
+                self.sleepers.insertAt(handle, part.position.x, part.position.y)
+        self.sleeping = len(living) - self.awakeCount
+        for part in dead:
+            part.asleep = False
+        self.deadList = list(dead)
+
+    def flush(self):
+        """
+        Removes the particles killed since the last flush, keeping awake ones in front of sleeping ones
+        Returns the particles removed, in the order they were killed """
+        living = self.alive
+        end = len(living) # Everything from here on is dying
+        for handle in living.dying:
+            index = living.indexOf(handle)
+            if index < 0:
+                continue
+            part = living.items[index]
+            if part.asleep:
+                self.sleepers.remove(handle, part.position)
+                part.asleep = False
+                self.sleeping -= 1
+            else: # Swap it to the end of the awake ones first, then past the sleepers
+                self.awakeCount -= 1
+                living.swap(index, self.awakeCount)
+                index = self.awakeCount
+            end -= 1
+            living.swap(index, end)
+        return living.flush() # Only has to take them off the end
+
+    def update(self, sec):
+        if self.sleeping > 0:
+            self.wake(sec)
+        living = self.alive # Particles that annihilate are killed here but only removed at the end
+        handles = living.handles
+        dying = living.dyingSet # Checked for every particle, quicker than living.isDying()
+        alive = self.aliveList
+        count = self.awakeCount # Sleepers are out of everyone's reach so they are left out of everything
+        if self.useSpatialHash: # Particles after i haven't moved yet when checked so this stays valid
+            grid = self.grid
+            grid.clear()
+            for i in range(count):
+                grid.insertAt(i, alive[i].position.x, alive[i].position.y)
+        awake = 0
+        kind = self.kind
+        player = self.player
+        playerDx = player.position.x - player.lastPosition.x # The player has already moved this step
+        playerDy = player.position.y - player.lastPosition.y
+        farStep = self.farStep
+        self.farTick += 1
+        for i in range(count):
+            part1 = alive[i]
+            if handles[i] in dying: # Already blown up with one before it
+                continue
+            if (farStep > 1 and (self.farTick + i) % farStep != 0 and
+                (abs(part1.position.x - player.position.x) > self.nearWidth or
+                 abs(part1.position.y - player.position.y) > self.nearHeight)): # Far away and not its turn
+                part1.behind += sec
+                continue
+            awake += 1
+            oldX = part1.position.x
+            oldY = part1.position.y
+            part1.update(sec + part1.behind) # Catch up on any time missed while far away
+            part1.behind = 0.0
+            pos = part1.position
+            dx = pos.x - oldX
+            dy = pos.y - oldY
+            if self.useSpatialHash: # Look along the whole path, others can come up to a step's travel to meet it
+                reach = self.pairReach + kind.maxSpeed * sec * farStep
+                others = self.grid.queryBox(min(oldX, pos.x) - reach, min(oldY, pos.y) - reach,
+                                            max(oldX, pos.x) + reach, max(oldY, pos.y) + reach, i)
+            else:
+                others = range(i+1, count)
+            self.pairChecks += len(others)
+            hit = -1 # First one part1 touches on the way
+            first = 2.0
+            for j in others: # Check all the ones after this particle for collision
+                part2 = alive[j]
+                other = part2.position
+                # Those after part1 haven't moved yet, sweep part1 along its path relative to where part2 is going
+                t = timeOfImpact(oldX - other.x, oldY - other.y, dx - part2.speed.x * sec, dy - part2.speed.y * sec,
+                                 part1.kind.radius + part2.kind.radius, part1.matter == part2.matter)
+                if t is not None:
+                    if t < first and handles[j] not in dying:
+                        first = t
+                        hit = j
+                elif part1.matter is not part2.matter and part1.checkCollision(other, part2.kind.radius, part2.kind.attractRadius) == 0:
+                    part1.attract(part2) # Attract range and attractive (pretty little particles)
+            if hit >= 0: # Full on collision, worked out where they touched
+                part2 = alive[hit]
+                x1 = oldX + dx * first
+                y1 = oldY + dy * first
+                x2 = part2.position.x + part2.speed.x * sec * first
+                y2 = part2.position.y + part2.speed.y * sec * first
+                if part1.matter == part2.matter: # Same stuff so just bounce
+                    pos.set(x1, y1)
+                    part1.bounce2(part2, x1 - x2, y1 - y2)
+                else: # Uh oh... things are gonna blow up here
+                    living.killAt(i) # Marked for death
+                    living.killAt(hit)
+                    self.explosionMan.addExplosion([(x1 + x2) / 2, (y1 + y2) / 2]) # Make explosion halfway between both
+            
+            if player.matter is not part1.matter: # Check proximity to player, sweeping both paths
+                t = timeOfImpact(oldX - player.lastPosition.x, oldY - player.lastPosition.y, pos.x - oldX - playerDx,
+                                 pos.y - oldY - playerDy, part1.kind.radius + player.kind.radius, False)
+                if t is not None: # Ru roh
+                    player.alive = False
+                elif part1.checkCollision(player.position, player.kind.radius, player.kind.attractRadius) == 0:
+                    player.attract(part1, False)
+        self.awake = awake
+        self.deadList.extend(self.flush()) # Dead ones are swapped out, nothing shuffles down
+        if self.useSleep:
+            self.sleepTicks += 1
+            if self.sleepTicks >= self.sleepCheck:
+                self.sleep()
+                self.sleepTicks = 0
+        # Now that we have tried to kill our particles, lets see if we can ressurect a few
+        if len(self.deadList) > 0:
+            self.lastSpawn += sec
+            if self.lastSpawn > self.spawnRate and self.spawnParticle(): # Keeps trying each tick if there's no room
+                self.lastSpawn = 0.0
+    
+    def sleep(self):
+        """
+        Puts to sleep every particle that has just about stopped with no other particle or
+        the player in reach. They are then skipped until wake() finds something coming close """
+        limit = self.sleepSpeed ** 2
+        alive = self.aliveList
+        count = self.awakeCount
+        slow = []
+        for i in range(count):
+            part = alive[i]
+            if part.speed.x ** 2 + part.speed.y ** 2 < limit:
+                slow.append(i)
+        if len(slow) == 0:
+            return
+        kind = self.kind
+        reach = self.pairReach
+        grid = self.grid # Positions have moved since it was built
+        grid.clear()
+        for i in range(count):
+            grid.insertAt(i, alive[i].position.x, alive[i].position.y)
+        handles = self.alive.handles
+        lonelyHandles = [] # Putting one to sleep moves others around, so they are found again by handle
+        player = self.player
+        playerReach = max(kind.radius + player.kind.radius, kind.attractRadius + player.kind.attractRadius)
+        for i in slow:
+            part = alive[i]
+            pos = part.position
+            if (pos.x - player.position.x) ** 2 + (pos.y - player.position.y) ** 2 <= playerReach ** 2:
+                continue
+            lonely = True
+            for j in grid.queryBox(pos.x - reach, pos.y - reach, pos.x + reach, pos.y + reach):
+                other = alive[j].position
+                if j != i and (pos.x - other.x) ** 2 + (pos.y - other.y) ** 2 <= reach ** 2:
+                    lonely = False
+                    break
+            if lonely:
+                for handle in self.sleepers.near(pos.x, pos.y, reach):
+                    other = self.alive.get(handle).position
+                    if (pos.x - other.x) ** 2 + (pos.y - other.y) ** 2 <= reach ** 2:
+                        lonely = False
+                        break
+            if lonely:
+                lonelyHandles.append(handles[i])
+        for handle in lonelyHandles:
+            self.fallAsleep(self.alive.indexOf(handle))
+
+    def fallAsleep(self, index):
+        """ Puts the awake particle at index in aliveList to sleep where it is, see sleep() """
+        living = self.alive
+        self.awakeCount -= 1
+        living.swap(index, self.awakeCount) # Last awake one takes its place
+        part = living.items[self.awakeCount]
+        pos = part.position
+        part.asleep = True
+        part.speed.set(0.0, 0.0)
+        part.behind = 0.0 # Wasn't going anywhere anyway
+        part.lastPosition.set(pos.x, pos.y) # Draw it still
+        self.sleepers.insertAt(living.handles[self.awakeCount], pos.x, pos.y)
+        self.sleeping += 1
+
+    def wake(self, sec):
+        """
+        Wakes every sleeping particle that an awake particle, the player or an explosion
+        could reach this tick """
+        kind = self.kind
+        margin = 2 * kind.maxSpeed * sec * self.farStep # Furthest a particle can move this tick, attraction can push it a little past maxSpeed
+        reach = self.pairReach + margin
+        alive = self.aliveList
+        for i in range(self.awakeCount): # Any woken go after these
+            self.wakeNear(alive[i].position, reach)
+        player = self.player
+        self.wakeNear(player.position, max(kind.radius + player.kind.radius, kind.attractRadius + player.kind.attractRadius) + margin + 2 * player.kind.maxSpeed * sec)
+        if self.explosionMan is not None:
+            for expl in self.explosionMan.active:
+                self.wakeNear(expl.position, kind.radius + expl.radius + expl.kind.growthRate * sec)
+
+    def wakeNear(self, pos, reach):
+        if self.sleeping == 0:
+            return
+        living = self.alive
+        woken = []
+        for handle in self.sleepers.near(pos.x, pos.y, reach):
+            other = living.get(handle).position
+            if (pos.x - other.x) ** 2 + (pos.y - other.y) ** 2 <= reach ** 2:
+                woken.append(living.indexOf(handle))
+        woken.sort() # The hash is in no particular order, aliveList is
+        for index in woken:
+            part = living.items[index]
+            part.asleep = False
+            self.sleepers.remove(living.handles[index], part.position)
+            living.swap(index, self.awakeCount) # First sleeper takes its place
+            self.awakeCount += 1
+            self.sleeping -= 1
+
+    def wakeAll(self):
+        for part in self.particles:
+            part.asleep = False
+        self.sleepers.clear()
+        self.sleeping = 0
+        self.awakeCount = len(self.alive)
+        self.sleepTicks = 0
+
+    def draw(self, screen, alpha=1.0, camera=None):
+        for alive in self.aliveList:
+            alive.draw(screen, alpha, camera)
+
+    def circles(self, alpha=1.0, view=None):
+        """
+        Returns (x, y, radius, color) for every living particle
+        view = (left, top, right, bot) of the world wanted, None for everything. Anything
+        not touching it is left out """
+        if view is None:
+            return [alive.circle(alpha) for alive in self.aliveList]
+        left, top, right, bot = view
+        circles = []
+        for alive in self.aliveList:
+            pos = alive.position
+            reach = alive.kind.radius + 1 # Drawn positions are rounded and between the last two
+            if pos.x + reach > left and pos.x - reach < right and pos.y + reach > top and pos.y - reach < bot:
+                circle = alive.circle(alpha)
+                x, y, radius = circle[:3]
+                if x + radius > left and x - radius < right and y + radius > top and y - radius < bot:
+                    circles.append(circle)
+        return circles
+
+    def motions(self, view=None):
+        """
+        Returns Particle.motion() for every living particle
+        view = (left, top, right, bot) of the world wanted, None for everything """
+        if view is None:
+            return [alive.motion() for alive in self.aliveList]
+        left, top, right, bot = view
+        motions = []
+        for alive in self.aliveList:
+            pos = alive.position
+            reach = alive.kind.radius + 1
+            if pos.x + reach > left and pos.x - reach < right and pos.y + reach > top and pos.y - reach < bot:
+                motions.append(alive.motion())
+        return motions
+        
+class EnemyManager(ParticleManager):
+    def __init__(self, maxEnemies, color, radius, spawnRate, player, explosionMan, width, height, rng=None):
+        """
+        Pretty much just a modified ParticleManager with some values set to 0 """
+        ParticleManager.__init__(self, maxEnemies, color, color, radius, 0, 0, 0, player, spawnRate, explosionMan, width, height, rng)
+       
+    def update(self, sec):
+        """ Returns the number of enemies destroyed this pass """
+        offset = 0
+        if len(self.explosionMan.active) > 0: # See if any are getting blown up, all in one go
+            hits = self.explosionMan.checkCollisions([e.position for e in self.aliveList], [e.kind.radius for e in self.aliveList])
+            for i in range(len(hits)):
+                if hits[i]: # Bogey down
+                    self.alive.killAt(i)
+            dead = self.flush()
+            self.deadList.extend(dead)
+            offset = len(dead)
+        
+        if len(self.deadList) > 0: # Bring the little beggers back
+            self.lastSpawn += sec
+            if self.lastSpawn > self.spawnRate and self.spawnParticle():
+                self.lastSpawn = 0
+        
+        return offset
+
+class ExplosionKind:
+    __slots__ = ('maxTime', 'growthRate', 'color')
+
+    def __init__(self, maxTime, growthRate, color):
+        """
+        Tuning shared by every explosion
+        maxTime = Time in seconds to stay alive
+        growthRate = Rate to grow per second
+        color = Color to draw with """
+        self.maxTime = maxTime
+        self.growthRate = growthRate
+        self.color = color
+
+class Explosion:
+    __slots__ = ('kind', 'position', 'radius', 'aliveTime')
+
+    def __init__(self, kind, position):
+        self.kind = kind
+        self.position = Vec2(0.0, 0.0)
+        self.reset(position)
+
+    maxTime = property(lambda self: self.kind.maxTime)
+    growthRate = property(lambda self: self.kind.growthRate)
+    color = property(lambda self: self.kind.color)
+
+    def reset(self, position):
+        """
+        Starts the explosion again from nothing at position, so old ones can be reused """
+        self.position.set(position[0], position[1])
+        self.radius = 0.0 # Start with 0 radius
+        self.aliveTime = 0.0 # Only just born
+    
+    def update(self, sec):
+        """
+        Returns True if still alive, False if time is up """
+        self.aliveTime += sec
+        if self.aliveTime >= self.kind.maxTime:
+            return False
+        self.radius += self.kind.growthRate * sec
+        return True
+    
+    def draw(self, screen, alpha=1.0, camera=None):
+        x, y, radius, color = self.circle()
+        if camera is not None:
+            if not camera.sees(x, y, radius):
+                return
+            x, y = camera.toScreen(x, y)
+        drawCircle(screen, color, (x, y), radius)
+
+    def circle(self):
+        """
+        Returns (x, y, radius, color) of the circle to draw for this explosion """
+        return (int(self.position.x), int(self.position.y), int(self.radius), self.kind.color)
+        
+class ExplosionManager:
+    def __init__(self, maxTime, growthRate, color):
+        self.explosions = EntityStore() # All active explosions (none to start)
+        self.active = self.explosions.items # The same explosions as a list, read it but change it through self.explosions
+        self.free = [] # Finished explosions waiting to be reused
+        self.started = 0 # Explosions started, one for each annihilation
+        self.kind = ExplosionKind(maxTime, growthRate, color)
+        self.grid = spatial.SpatialHash(max(maxTime * growthRate, 1)) # Cells about as big as the biggest explosion
+        
+    def addExplosion(self, position):
+        """
+        Starts an explosion, it joins the rest at the next update() so this can be called
+        while they are being looped over
+        Returns the explosion """
+        if len(self.free) > 0: # Reuse an old one rather than making a new one
+            expl = self.free.pop()
+            expl.reset(position)
+        else:
+            expl = Explosion(self.kind, position)
+        self.explosions.spawn(expl)
+        self.started += 1
+        return expl
+    
+    def update(self, sec):
+        self.explosions.flush()
+        active = self.active
+        i = 0
+        while i < len(active):
+            if active[i].update(sec):
+                i += 1
+            else: # Swap the last one into its place so nothing has to shuffle down
+                self.free.append(self.explosions.removeAt(i))
+    
+    def draw(self, screen, alpha=1.0, camera=None):
+        for exp in self.active:
+            exp.draw(screen, alpha, camera)
+
+    def circles(self, view=None):
+        """
+        Returns (x, y, radius, color) for every active explosion
+        view = (left, top, right, bot) of the world wanted, None for everything """
+        if view is None:
+            return [exp.circle() for exp in self.active]
+        left, top, right, bot = view
+        circles = []
+        for exp in self.active:
+            circle = exp.circle()
+            x, y, radius = circle[:3]
+            if x + radius > left and x - radius < right and y + radius > top and y - radius < bot:
+                circles.append(circle)
+        return circles
+    
+    def checkCollision(self, pos, radius):
+        """ Checks to see if any explosions are within this range 
+        Returns True if there is a collision, False if not """
+        x2 = pos[0]
+        y2 = pos[1]
+        for exp in self.active:
+            x1 = exp.position.x
+            y1 = exp.position.y
+            dist = ((x1 - x2) ** 2 + (y2 - y1) ** 2)
+            if dist < (radius + exp.radius) ** 2: # Squaring is less intensive than sqrt
+                return True # Balls are touching
+        return False
+
+    def checkCollisions(self, positions, radii):
+        """
+        Same as checkCollision for a whole list of circles at once, using a grid so each
+        circle is only checked against explosions near it
+        positions = Vec2 centre of each circle
+        Returns a list of True/False, one for each position """
+        hits = [False] * len(positions)
+        active = self.active
+        if len(active) == 0 or len(positions) == 0:
+            return hits
+        grid = self.grid
+        grid.clear()
+        biggest = 0.0
+        for i in range(len(active)):
+            grid.insert(i, active[i].position)
+            if active[i].radius > biggest:
+                biggest = active[i].radius
+        for i in range(len(positions)):
+            x2 = positions[i].x
+            y2 = positions[i].y
+            radius = radii[i]
+            for j in grid.query((positions[i],), radius + biggest):
+                exp = active[j]
+                x1 = exp.position.x
+                y1 = exp.position.y
+                if ((x1 - x2) ** 2 + (y2 - y1) ** 2) < (radius + exp.radius) ** 2:
+                    hits[i] = True
+                    break
+        return hits
@@ -0,0 +1,84 @@
+import collections
+import pygame
+from settings import *
+
+class TextCache:
+    def __init__(self, size, color, maxSize=32):
+        """
+        Renders strings with one font and keeps the images so the same text is only rendered once
+        size = Font size, the font is only made the first time something is rendered
+        color = Color of the text
+        maxSize = Most strings to keep, least recently used are thrown out first """
+        self.size = size
+        self.color = color
+        self.maxSize = maxSize
+        self.font = None
+        self.images = collections.OrderedDict() # text -> image
+
+    def render(self, text):
+        image = self.images.get(text)
+        if image is None:
+            if self.font is None:
+                if not pygame.font.get_init():
+                    pygame.font.init()
+                self.font = pygame.font.Font(None, self.size) # Default font
+            image = self.font.render(text, 1, self.color)
+            self.images[text] = image
+            if len(self.images) > self.maxSize:
+                self.images.popitem(last=False) # Throw out the oldest
+        else:
+            self.images.move_to_end(text)
+        return image
+
+class Hud:
+    def __init__(self, showStats=SHOW_STATS):
+        """
+        Score, game over text and frame stats, all rendered through text caches
+        showStats = Show the frames per second and physics time counters """
+        self.showStats = showStats
+        self.bigText = TextCache(76, TEXT_COLOR)
+        self.text = TextCache(36, TEXT_COLOR)
+        self.smallText = TextCache(24, TEXT_COLOR)
+        self.statsText = ""
+        self.frames = 0 # Frames since the stats were last worked out
+        self.frameTime = 0.0 # Seconds of those frames
+        self.steps = 0 # Physics steps in those frames
+        self.stepTime = 0.0 # Seconds spent running those steps
+
+    def frame(self, frameTime, steps, stepTime):
+        """
+        Counts a frame for the stats, the text only changes every STATS_INTERVAL seconds
+        frameTime = Seconds since the last frame
+        steps = Physics steps run this frame
+        stepTime = Seconds spent running them """
+        self.frames += 1
+        self.frameTime += frameTime
+        self.steps += steps
+        self.stepTime += stepTime
+        if self.frameTime >= STATS_INTERVAL:
+            fps = self.frames / self.frameTime
+            tickMs = 0.0
+            if self.steps > 0:
+                tickMs = self.stepTime * 1000 / self.steps
+            self.statsText = "FPS: %d  Tick: %.2fms" % (fps, tickMs)
+            self.frames = 0
+            self.frameTime = 0.0
+            self.steps = 0
+            self.stepTime = 0.0
+
+    def drawScore(self, renderer, score):
+        renderer.blit(self.text.render("Score: " + str(score)), SCORE_POSITION)
+        if self.showStats and self.statsText:
+            renderer.blit(self.smallText.render(self.statsText), STATS_POSITION)
+
+    def drawGameOver(self, renderer):
+        gameOverText = self.bigText.render("GAME OVER")
+        gameOverTextPos = gameOverText.get_rect()
+        gameOverTextPos.centerx = (WINDOW_WIDTH // 2)
+        gameOverTextPos.centery = (WINDOW_HEIGHT // 2)
+        resetText = self.text.render("<Press Space or A to reset>")
+        resetTextPos = resetText.get_rect()
+        resetTextPos.centerx = gameOverTextPos.centerx
+        resetTextPos.centery = gameOverTextPos.centery + gameOverTextPos.height
+        renderer.blit(gameOverText, gameOverTextPos) # Game over, show death screen
+        renderer.blit(resetText, resetTextPos)
@@ -0,0 +1,132 @@
+import time, json, collections, cProfile
+
+now = time.perf_counter_ns
+
+class Instrument:
+    enabled = True
+
+    def __init__(self, window=1000, trace=False, maxEvents=1000000):
+        """
+        Records how long each phase of a frame takes, plus counters like collision checks
+        window = Number of recent samples of each phase to keep for percentiles
+        trace = Also keep every timing as an event for a Chrome trace file
+        maxEvents = Most trace events to keep, the rest are dropped """
+        self.window = window
+        self.trace = trace
+        self.maxEvents = maxEvents
+        self.samples = {} # name -> recent timings in ns, or recent counts
+        self.totals = {} # counter name -> total since starting
+        self.events = [] # (name, start ns, duration ns) or (name, time ns, None, value) for counters
+        self.origin = now()
+
+    def start(self):
+        """ Returns the time to pass to stop() """
+        return now()
+
+    def stop(self, name, start):
+        """
+        Records the phase name as taking from start until now
+        Returns now so the next phase can start from it """
+        end = now()
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = collections.deque(maxlen=self.window)
+        samples.append(end - start)
+        if self.trace and len(self.events) < self.maxEvents:
+            self.events.append((name, start, end - start))
+        return end
+
+    def count(self, name, value):
+        """ Adds value to the counter name, each call is one sample for its percentiles """
+        self.totals[name] = self.totals.get(name, 0) + value
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = collections.deque(maxlen=self.window)
+        samples.append(value)
+        if self.trace and len(self.events) < self.maxEvents:
+            self.events.append((name, now(), None, value))
+
+    def percentiles(self, name, points=(50, 95, 99)):
+        """ Returns a list with the value at each percentile in points of the recent samples of name """
+        ordered = sorted(self.samples.get(name, ()))
+        if len(ordered) == 0:
+            return [0 for p in points]
+        return [ordered[min(int(len(ordered) * p / 100.0), len(ordered) - 1)] for p in points]
+
+    def report(self):
+        """ Returns a table of percentiles for every phase and counter as a string """
+        lines = ["%-24s %10s %10s %10s %10s" % ("", "p50", "p95", "p99", "total")]
+        for name in sorted(self.samples):
+            p50, p95, p99 = self.percentiles(name)
+            if name in self.totals:
+                lines.append("%-24s %10d %10d %10d %10d" % (name, p50, p95, p99, self.totals[name]))
+            else: # Timings are shown in ms
+                lines.append("%-24s %10.3f %10.3f %10.3f %10s" % (name, p50 / 1e6, p95 / 1e6, p99 / 1e6, "ms"))
+        return "\n".join(lines)
+
+    def writeTrace(self, path):
+        """ Saves the recorded events as a Chrome trace file (chrome://tracing or Perfetto) """
+        events = []
+        for event in self.events:
+            ts = (event[1] - self.origin) / 1000.0 # Trace times are in microseconds
+            if event[2] is None:
+                events.append({"name": event[0], "ph": "C", "ts": ts, "pid": 0, "tid": 0, "args": {"value": event[3]}})
+            else:
+                events.append({"name": event[0], "ph": "X", "ts": ts, "dur": event[2] / 1000.0, "pid": 0, "tid": 0})
+        out = open(path, "w")
+        try:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, out)
+        finally:
+            out.close()
+
+class NullInstrument:
+    """ Stands in for Instrument when nothing is being recorded, every call does nothing """
+    enabled = False
+
+    def start(self):
+        return 0
+
+    def stop(self, name, start):
+        return 0
+
+    def count(self, name, value):
+        pass
+
+NULL = NullInstrument()
+
+def profile(func, path):
+    """
+    Runs func under cProfile and saves the stats to path as a .pstats file, even if func exits
+    Returns whatever func returns """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func)
+    finally:
+        profiler.dump_stats(path)
+        print("Profile saved to " + path)
+
+def addArguments(parser):
+    """ Adds the instrumentation switches to an argparse parser """
+    parser.add_argument("--timings", action="store_true", help="Print per phase timing percentiles when done")
+    parser.add_argument("--trace", metavar="FILE", help="Save a Chrome trace of every phase to FILE")
+    parser.add_argument("--profile", metavar="FILE", help="Run under cProfile and save the stats to FILE")
+
+def fromOptions(options):
+    """ Returns an Instrument if --timings or --trace was given, NULL otherwise """
+    if options.timings or options.trace:
+        return Instrument(trace=bool(options.trace))
+    return NULL
+
+def runWithOptions(func, inst, options):
+    """ Runs func, under cProfile if asked, then prints or saves whatever inst recorded """
+    try:
+        if options.profile:
+            profile(func, options.profile)
+        else:
+            func()
+    finally:
+        if options.timings:
+            print(inst.report())
+        if options.trace:
+            inst.writeTrace(options.trace)
+            print("Trace saved to " + options.trace)
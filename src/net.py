@@ -0,0 +1,301 @@
+import struct
+
+# Everything on the wire is little endian. Each message is its payload length and type
+# then the payload. The server sends HELLO once, then a KEYFRAME with everything in it,
+# then a DELTA each frame with only what changed since the one before. A client that
+# falls too far behind is skipped ahead with another KEYFRAME. Positions are whole
+# numbers of 1/quantum pixels so they fit in 16 bits, ids are entity store handles
+MAGIC = b"AMNT"
+VERSION = 1
+MESSAGE = struct.Struct("<IB") # payload length, type
+HELLO = struct.Struct("<4sHHHdB") # magic, version, world width, world height, stepTime, quantum
+LOOK = struct.Struct("<B3B3B") # radius, matter color, antimatter color, for the player, enemies then particles
+COLOR = struct.Struct("<3B") # Explosion color
+FRAME = struct.Struct("<IdiHHHB") # ticks, time sent, score, games, player x, player y, player flags
+SECTION = struct.Struct("<III") # full records, moved records, removed ids; enemies, particles then explosions
+FULL = struct.Struct("<IHHB") # id, x, y, flags
+MOVED = struct.Struct("<Ibb") # id, change in x, change in y, for anything that moved a little
+EXPLOSION = struct.Struct("<IHHH") # id, x, y, radius in whole pixels
+INPUT = struct.Struct("<BB") # replay.KIND_PRESS or KIND_RELEASE, world action
+
+MSG_HELLO = 0
+MSG_KEYFRAME = 1
+MSG_DELTA = 2
+MSG_INPUT = 3
+
+FLAG_MATTER = 1
+FLAG_ALIVE = 2 # Player only
+
+ENEMIES = 0
+PARTICLES = 1
+EXPLOSIONS = 2
+
+ID_MASK = 0xFFFFFFFF # Handles are cut to 32 bits, the slot is in the low bits so living ones never clash
+MAX_POSITION = 0xFFFF
+
+def message(kind, payload):
+    return MESSAGE.pack(len(payload), kind) + payload
+
+def quantumFor(world, quantum):
+    """
+    Returns the most steps a pixel up to quantum that still fits the world in 16 bits
+    Raises ValueError if even whole pixels don't fit """
+    size = max(world.settings.WORLD_WIDTH, world.settings.WORLD_HEIGHT)
+    quantum = min(quantum, MAX_POSITION // max(int(size), 1))
+    if quantum < 1:
+        raise ValueError("World is too big to send, %d pixels across" % size)
+    return quantum
+
+def hello(world, stepTime, quantum):
+    """ Returns the HELLO payload describing world """
+    s = world.settings
+    chunks = [HELLO.pack(MAGIC, VERSION, int(s.WORLD_WIDTH), int(s.WORLD_HEIGHT), stepTime, quantum)]
+    for radius, matColor, antiColor in ((s.PLAYER_RADIUS, s.MAT_COLOR, s.ANTI_COLOR), (s.ENEMY_RADIUS, s.ENEMY_COLOR, s.ENEMY_COLOR),
+                                        (s.PARTICLE_RADIUS, s.MAT_COLOR, s.ANTI_COLOR)):
+        chunks.append(LOOK.pack(radius, *(tuple(matColor) + tuple(antiColor))))
+    chunks.append(COLOR.pack(*s.EXPLOSION_COLOR))
+    return b"".join(chunks)
+
+def quantise(value, quantum):
+    return min(max(int(value * quantum + 0.5), 0), MAX_POSITION)
+
+def entities(man, quantum):
+    """
+    Returns {id: (x, y, flags)} for every living particle or enemy in man """
+    if not hasattr(man, "aliveList"): # Array backend, rows move when particles die so each carries its own id
+        import numpy # Only here if the world already uses it
+        n = man.count
+        rows = numpy.clip(numpy.rint(man.position[:n] * quantum), 0, MAX_POSITION).astype(int).tolist()
+        flags = man.matter[:n].astype(int).tolist()
+        ids = (man.ids[:n] & ID_MASK).tolist()
+        return dict((ids[i], (rows[i][0], rows[i][1], flags[i])) for i in range(n))
+    state = {}
+    for handle, part in zip(man.alive.handles, man.aliveList):
+        pos = part.position
+        x = int(pos.x * quantum + 0.5)
+        y = int(pos.y * quantum + 0.5)
+        if x < 0 or y < 0 or x > MAX_POSITION or y > MAX_POSITION: # Only just over an edge
+            x = quantise(pos.x, quantum)
+            y = quantise(pos.y, quantum)
+        state[handle & ID_MASK] = (x, y, int(part.matter))
+    return state
+
+def explosions(man, quantum):
+    """ Returns {id: (x, y, radius)} for every active explosion """
+    state = {}
+    for handle, expl in zip(man.explosions.handles, man.active):
+        pos = expl.position
+        state[handle & ID_MASK] = (quantise(pos.x, quantum), quantise(pos.y, quantum), min(int(expl.radius), MAX_POSITION))
+    return state
+
+def encodeSection(old, new, record, chunks):
+    """
+    Adds the records that turn old into new to chunks
+    old, new = {id: (x, y, flags or radius)}
+    record = FULL or EXPLOSION, explosions don't move so only ever get full records """
+    full = []
+    moved = []
+    for id, value in new.items():
+        before = old.get(id)
+        if before == value:
+            continue
+        if before is not None and record is FULL and before[2] == value[2]:
+            dx = value[0] - before[0]
+            dy = value[1] - before[1]
+            if -128 <= dx <= 127 and -128 <= dy <= 127:
+                moved.append(MOVED.pack(id, dx, dy))
+                continue
+        full.append(record.pack(id, value[0], value[1], value[2]))
+    removed = [id for id in old if id not in new]
+    chunks.append(SECTION.pack(len(full), len(moved), len(removed)))
+    chunks.extend(full)
+    chunks.extend(moved)
+    chunks.append(struct.pack("<%dI" % len(removed), *removed))
+
+class FrameEncoder:
+    def __init__(self, quantum):
+        """
+        Turns the world into KEYFRAME and DELTA payloads. Deltas are against the last
+        frame captured, so every client that is up to date can be sent the same bytes
+        quantum = Steps per pixel for positions, see quantumFor() """
+        self.quantum = quantum
+        self.header = b""
+        self.sections = [{}, {}, {}] # ENEMIES, PARTICLES, EXPLOSIONS as of the last capture
+        self.last = [{}, {}, {}] # And as of the one before
+
+    def capture(self, world, games, sent):
+        """
+        Quantises the world ready for delta() and keyframe()
+        games = New games started so far, so clients know to clear the screen
+        sent = Time the frame goes out, for clients to measure latency with """
+        q = self.quantum
+        player = world.player
+        flags = int(player.matter) * FLAG_MATTER | int(player.alive) * FLAG_ALIVE
+        self.header = FRAME.pack(world.ticks & ID_MASK, sent, world.score, games & 0xFFFF,
+                                 quantise(player.position.x, q), quantise(player.position.y, q), flags)
+        self.last = self.sections
+        self.sections = [entities(world.enemyMan, q), entities(world.particleMan, q), explosions(world.explosionMan, q)]
+
+    def delta(self):
+        """ Returns what changed between the last two captures """
+        chunks = [self.header]
+        for i in range(3):
+            encodeSection(self.last[i], self.sections[i], (FULL, FULL, EXPLOSION)[i], chunks)
+        return b"".join(chunks)
+
+    def keyframe(self):
+        """ Returns everything as of the last capture """
+        chunks = [self.header]
+        for i in range(3):
+            encodeSection({}, self.sections[i], (FULL, FULL, EXPLOSION)[i], chunks)
+        return b"".join(chunks)
+
+class MessageReader:
+    def __init__(self, maxLength=1 << 30):
+        """
+        Splits a stream of bytes back into messages
+        maxLength = Longest payload to accept """
+        self.maxLength = maxLength
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """
+        Adds bytes read from a socket
+        Returns a list of (type, payload) for every whole message now read
+        Raises ValueError for a payload over maxLength """
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        offset = 0
+        while len(buffer) - offset >= MESSAGE.size:
+            length, kind = MESSAGE.unpack_from(buffer, offset)
+            if length > self.maxLength:
+                raise ValueError("Message of %d bytes is too long" % length)
+            end = offset + MESSAGE.size + length
+            if end > len(buffer):
+                break
+            messages.append((kind, bytes(buffer[offset + MESSAGE.size:end])))
+            offset = end
+        del buffer[:offset]
+        return messages
+
+class Mirror:
+    def __init__(self, payload):
+        """
+        The client's copy of the server's world, built up from its frames
+        payload = The HELLO payload
+        Raises ValueError if it isn't from a server we understand """
+        magic, version, width, height, stepTime, quantum = HELLO.unpack_from(payload, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an Antimatter server")
+        if version != VERSION:
+            raise ValueError("Server speaks version %d, expected %d" % (version, VERSION))
+        self.width = width
+        self.height = height
+        self.stepTime = stepTime
+        self.quantum = quantum
+        offset = HELLO.size
+        self.looks = [] # (radius, matter color, antimatter color) for the player, enemies and particles
+        for i in range(3):
+            values = LOOK.unpack_from(payload, offset)
+            self.looks.append((values[0], values[1:4], values[4:7]))
+            offset += LOOK.size
+        self.explosionColor = COLOR.unpack_from(payload, offset)
+        self.synced = False # Had a keyframe yet
+        self.ticks = 0
+        self.sent = 0.0
+        self.score = 0
+        self.games = 0
+        self.player = [0, 0, 0, 0, FLAG_MATTER | FLAG_ALIVE] # lastX, lastY, x, y, flags
+        self.sections = [{}, {}, {}] # id -> [lastX, lastY, x, y, flags] for ENEMIES and PARTICLES, (x, y, radius) for EXPLOSIONS
+        self.moved = [[], []] # ids that moved last frame, their last position needs catching up
+
+    def apply(self, kind, payload):
+        """
+        Updates the copy with a KEYFRAME or DELTA payload, deltas before the first keyframe are ignored
+        Returns True if anything was applied """
+        if kind == MSG_KEYFRAME:
+            self.sections = [{}, {}, {}]
+            self.moved = [[], []]
+            self.synced = True
+        elif kind != MSG_DELTA or not self.synced:
+            return False
+        for i in range(2): # Anything that doesn't move this frame stays where it is
+            section = self.sections[i]
+            for id in self.moved[i]:
+                entity = section.get(id)
+                if entity is not None:
+                    entity[0] = entity[2]
+                    entity[1] = entity[3]
+            self.moved[i] = []
+        self.ticks, self.sent, self.score, self.games, x, y, flags = FRAME.unpack_from(payload, 0)
+        player = self.player
+        if kind == MSG_KEYFRAME:
+            player[2] = x
+            player[3] = y
+        player[0] = player[2]
+        player[1] = player[3]
+        player[2] = x
+        player[3] = y
+        player[4] = flags
+        offset = FRAME.size
+        for i in range(3):
+            full, moved, removed = SECTION.unpack_from(payload, offset)
+            offset += SECTION.size
+            section = self.sections[i]
+            if i == EXPLOSIONS:
+                for j in range(full):
+                    id, x, y, radius = EXPLOSION.unpack_from(payload, offset)
+                    offset += EXPLOSION.size
+                    section[id] = (x, y, radius)
+            else:
+                changed = self.moved[i]
+                for j in range(full):
+                    id, x, y, flags = FULL.unpack_from(payload, offset)
+                    offset += FULL.size
+                    entity = section.get(id)
+                    if entity is None:
+                        section[id] = [x, y, x, y, flags]
+                    else:
+                        entity[2] = x
+                        entity[3] = y
+                        entity[4] = flags
+                        changed.append(id)
+                for j in range(moved):
+                    id, dx, dy = MOVED.unpack_from(payload, offset)
+                    offset += MOVED.size
+                    entity = section[id]
+                    entity[2] += dx
+                    entity[3] += dy
+                    changed.append(id)
+            for id in struct.unpack_from("<%dI" % removed, payload, offset):
+                del section[id]
+            offset += 4 * removed
+        return True
+
+    def fill(self, state, arrived):
+        """
+        Copies the world as of the last frame into a pipeline.RenderState to draw
+        arrived = When the last frame came in, for drawing part way to the next """
+        q = float(self.quantum)
+        moving = []
+        add = moving.append
+        lastX, lastY, x, y, flags = self.player
+        radius, matColor, antiColor = self.looks[0]
+        add((lastX / q, lastY / q, x / q, y / q, radius, matColor if flags & FLAG_MATTER else antiColor))
+        for i in (ENEMIES, PARTICLES):
+            radius, matColor, antiColor = self.looks[i + 1]
+            for lastX, lastY, x, y, flags in self.sections[i].values():
+                add((lastX / q, lastY / q, x / q, y / q, radius, matColor if flags & FLAG_MATTER else antiColor))
+        color = self.explosionColor
+        state.moving = moving
+        state.explosions = [(int(x / q), int(y / q), radius, color) for x, y, radius in self.sections[EXPLOSIONS].values()]
+        state.ticks = self.ticks
+        state.score = self.score
+        state.alive = bool(self.player[4] & FLAG_ALIVE)
+        state.games = self.games
+        state.captured = arrived
+
+def inputMessage(kind, action):
+    """ Returns the message for a client to send for a key going down (replay.KIND_PRESS) or up (KIND_RELEASE) """
+    return message(MSG_INPUT, INPUT.pack(kind, action))
@@ -0,0 +1,354 @@
+import random
+import numpy
+import spatial
+from entities import drawCircle
+from settings import SPAWN_TRIES, SPAWN_SAMPLES
+
+CELL_OFFSET = 1 << 15 # Keeps cell coordinates positive when building keys
+CELL_STRIDE = 1 << 16 # Key = x cell * stride + y cell
+# Own cell plus half of the cells around it, the other half is covered from their side
+NEIGHBOUR_OFFSETS = (0, 1, CELL_STRIDE - 1, CELL_STRIDE, CELL_STRIDE + 1)
+
+def timesOfImpact(start, move, reach, parting=True):
+    """
+    Same as entities.timeOfImpact for many pairs of circles at once
+    start = Where the first of each pair starts relative to the second
+    move = How far the first of each pair moves relative to the second over the step
+    reach = Distance apart each pair touches at
+    parting = Whether pairs already touching go if they are moving apart, one for all or an array of one per pair
+    Returns the fraction of the step each pair touches at, inf for those that don't """
+    b = (start * move).sum(1)
+    c = (start ** 2).sum(1) - reach ** 2
+    a = (move ** 2).sum(1)
+    disc = b * b - a * c
+    t = numpy.empty(len(b))
+    t.fill(numpy.inf)
+    t[(c <= 0) & ((b < 0) | numpy.logical_not(parting))] = 0 # Already touching
+    coming = (c > 0) & (b < 0) & (disc >= 0)
+    t[coming] = (-b[coming] - numpy.sqrt(disc[coming])) / a[coming]
+    t[t > 1] = numpy.inf
+    return t
+
+class ArrayParticleManager:
+    def __init__(self, maxParticles, matColor, antiColor, radius, maxSpeed, attractRadius, force, player, spawnRate, explosionMan, width, height, rng=None):
+        """
+        Drop in replacement for ParticleManager that keeps every particle in numpy arrays
+        and updates them all at once instead of one Particle object at a time.
+        Living particles are always packed into the first self.count rows.
+        Takes the same arguments as ParticleManager
+        """
+        self.maxParticles = maxParticles
+        self.matColor = matColor
+        self.antiColor = antiColor
+        self.player = player
+        self.spawnRate = spawnRate
+        self.explosionMan = explosionMan
+        self.rng = rng or random
+        self.width = width
+        self.height = height
+        self.lastSpawn = 0.0 # Time since last spawn
+        self.pairReach = 2 * max(radius, attractRadius) # Furthest apart two particles can still interact
+        self.pairChecks = 0 # Pairs checked for collision, for instrumentation
+        self.spawnRetries = 0 # Random spots tried when spawning, for instrumentation
+        self.spawnSamples = SPAWN_SAMPLES # Random spots to try before mapping out the free space
+        self.spawnTries = SPAWN_TRIES # Random spots to try once no space is completely free
+        self.awake = 0 # Particles updated last tick, every living one as these never sleep
+
+        self.count = 0 # Number of living particles, they sit in rows [0, count)
+        self.position = numpy.zeros((maxParticles, 2))
+        self.lastPosition = numpy.zeros((maxParticles, 2)) # Position before the last update, for drawing in between
+        self.speed = numpy.zeros((maxParticles, 2))
+        self.force = numpy.zeros((maxParticles, 2)) # Attraction gathered this tick
+        self.matter = (numpy.arange(maxParticles) % 2 == 0) # Half matter, half antimatter
+        self.radius = numpy.empty(maxParticles)
+        self.radius.fill(radius)
+        self.attractRadius = numpy.empty(maxParticles)
+        self.attractRadius.fill(attractRadius)
+        self.strength = numpy.empty(maxParticles) # Attraction force of each particle
+        self.strength.fill(force)
+        self.maxSpeed = numpy.empty(maxParticles)
+        self.maxSpeed.fill(maxSpeed)
+        self.ids = numpy.zeros(maxParticles, dtype=numpy.int64) # Given to each row as it spawns and moved with it, rows don't stay put
+        self.nextId = 0
+
+    def spawnParticle(self):
+        """
+        Spawns a particle if we aren't at the max limit. Particle is spawned at a random location
+        outside the range of any other particles or player and has no momentum
+        Returns True if one was spawned, False if there are none dead or no room right now
+        """
+        return self.spawnParticles(1) > 0
+
+    def spawnParticles(self, count):
+        """
+        Spawns up to count dead particles in one pass, each one is kept clear of the
+        ones spawned before it. Gives up early if there is no room left
+        Returns the number spawned """
+        count = min(count, self.maxParticles - self.count)
+        if count == 0:
+            return 0
+        slot = self.count
+        radius = int(self.radius[slot]) # Every particle here is the same size
+        attractRadius = int(self.attractRadius[slot])
+        top = radius + 1 # Highest it can spawn
+        left = radius + 1 # Most left it can spawn
+        right = int(self.width) - radius - 1 # Most right it can spawn
+        bot = int(self.height) - radius - 1 # Lowest it can spawn
+        reach = max(radius * 2, attractRadius * 2) # Must be further than this from another particle
+        grid = spatial.SpawnGrid(left, top, right, bot, radius, self.rng)
+        player = self.player # Too close to player
+        grid.block(player.position, max(radius + player.radius, attractRadius + player.attractRadius))
+        # Anything in range of another particle is out
+        reaches = numpy.maximum(self.radius[:slot] + radius, self.attractRadius[:slot] + attractRadius).tolist()
+        positions = self.position[:slot].tolist()
+        for i in range(slot):
+            grid.block(positions[i], reaches[i])
+
+        spawned = 0
+        while spawned < count:
+            pos = grid.find(self.spawnTries, self.spawnSamples)
+            if pos is None:
+                break # No room, try again later
+            slot = self.count
+            self.position[slot] = pos
+            self.lastPosition[slot] = pos
+            self.speed[slot] = 0
+            self.ids[slot] = self.nextId
+            self.nextId += 1
+            self.count += 1
+            grid.block(pos, reach)
+            spawned += 1
+        self.spawnRetries += grid.retries
+        return spawned
+
+    def spawnAll(self):
+        """
+        Turns all dead particles into living ones, or as many as there is room for """
+        self.spawnParticles(self.maxParticles - self.count)
+
+    def findPairs(self, pos, reach):
+        """
+        Returns (first, second, dist) arrays for every pair of rows with first < second
+        within reach of each other, found by sorting particles into grid cells """
+        n = len(pos)
+        cellSize = float(max(reach, 1)) # Cells as wide as the reach so only neighbours need checking
+        cells = numpy.floor(pos / cellSize).astype(numpy.int64) + CELL_OFFSET
+        keys = cells[:, 0] * CELL_STRIDE + cells[:, 1]
+        order = numpy.argsort(keys, kind='mergesort')
+        sortedKeys = keys[order]
+
+        firsts = []
+        seconds = []
+        for offset in NEIGHBOUR_OFFSETS:
+            # Searching with sorted keys keeps this fast, sortedKeys + offset is still sorted
+            target = sortedKeys + offset
+            lo = numpy.searchsorted(sortedKeys, target, 'left')
+            counts = numpy.searchsorted(sortedKeys, target, 'right') - lo
+            total = counts.sum()
+            if total == 0:
+                continue
+            # Walk through each row's run of matches in the sorted order
+            starts = numpy.cumsum(counts) - counts
+            first = order[numpy.repeat(numpy.arange(n), counts)]
+            second = order[numpy.arange(total) + numpy.repeat(lo - starts, counts)]
+            if offset == 0: # Own cell, only want each pair once
+                keep = first < second
+                first = first[keep]
+                second = second[keep]
+            firsts.append(numpy.minimum(first, second))
+            seconds.append(numpy.maximum(first, second))
+
+        if len(firsts) == 0:
+            empty = numpy.zeros(0, numpy.int64)
+            return empty, empty, numpy.zeros(0)
+        first = numpy.concatenate(firsts)
+        second = numpy.concatenate(seconds)
+        self.pairChecks += len(first)
+        dist = numpy.sqrt(((pos[first] - pos[second]) ** 2).sum(1))
+        close = dist <= reach
+        return first[close], second[close], dist[close]
+
+    def update(self, sec):
+        n = self.count
+        self.awake = n
+        pos = self.position[:n]
+        speed = self.speed[:n]
+        radius = self.radius[:n]
+        matter = self.matter[:n]
+        limit = self.maxSpeed[:n, None]
+        oldPos = self.lastPosition[:n]
+        oldPos[:] = pos
+
+        # Move everything, anything touching an edge on the way bounces off from there
+        move = speed * sec
+        t = numpy.ones(n) # Fraction of the step before touching an edge
+        for axis, size in ((0, self.width), (1, self.height)):
+            d = move[:, axis]
+            ahead = pos[:, axis] + d
+            over = (d > 0) & (ahead + radius > size)
+            t[over] = numpy.minimum(t[over], (size - radius[over] - pos[over, axis]) / d[over])
+            over = (d < 0) & (ahead - radius < 0)
+            t[over] = numpy.minimum(t[over], (radius[over] - pos[over, axis]) / d[over])
+        numpy.maximum(t, 0, out=t) # Already over the edge
+        pos += move * t[:, None]
+        out = t < 1
+        speed[out] *= -1 # Go back for the rest of the step
+        pos[out] += speed[out] * (sec * (1 - t[out]))[:, None]
+        numpy.clip(speed, -limit, limit, out=speed)
+
+        # Sweep every pair along their paths, so anything that could meet this step is a pair
+        move = pos - oldPos
+        reach = self.pairReach
+        if n > 0:
+            reach += 2 * numpy.sqrt((move ** 2).sum(1)).max()
+        first, second, dist = self.findPairs(oldPos, reach)
+        opposite = matter[first] != matter[second]
+        hit = timesOfImpact(oldPos[first] - oldPos[second], move[first] - move[second], radius[first] + radius[second], ~opposite)
+        collide = hit <= 1
+        hit = hit[collide]
+        dist = numpy.maximum(numpy.sqrt(((pos[first] - pos[second]) ** 2).sum(1)), 1e-9) # Where they ended up
+        attract = ~collide & opposite & (dist <= self.attractRadius[first] + self.attractRadius[second])
+        c1 = first[collide]
+        c2 = second[collide]
+        touch1 = oldPos[c1] + move[c1] * hit[:, None] # Where each colliding pair touched
+        touch2 = oldPos[c2] + move[c2] * hit[:, None]
+
+        # Same stuff bouncing, same maths as Particle.bounce2
+        bounce = ~opposite[collide]
+        b1 = c1[bounce]
+        b2 = c2[bounce]
+        if len(b1) > 0:
+            avgSpeed = (numpy.abs(speed[b1]) + numpy.abs(speed[b2])) * 0.5
+            normal = touch1[bounce] - touch2[bounce]
+            normal /= numpy.maximum(numpy.sqrt((normal ** 2).sum(1)), 1e-9)[:, None]
+            speed[b1] = normal * avgSpeed
+            speed[b2] = normal * avgSpeed * -1
+            numpy.clip(speed, -limit, limit, out=speed)
+            pos[b1] = touch1[bounce]
+
+        # Opposites in range pull towards the point halfway between them
+        force = self.force[:n]
+        force.fill(0)
+        a1 = first[attract]
+        a2 = second[attract]
+        if len(a1) > 0:
+            diff = pos[a1] - pos[a2]
+            scale = 1 / (2 * dist[attract] ** 2)
+            numpy.add.at(force, a1, diff * (-self.strength[a1] * scale)[:, None])
+            numpy.add.at(force, a2, diff * (self.strength[a2] * scale)[:, None])
+
+        # Check proximity to player, sweeping both paths
+        player = self.player
+        hostile = matter != player.matter
+        playerMove = numpy.array(player.position, dtype=float) - numpy.array(player.lastPosition, dtype=float)
+        touching = timesOfImpact(oldPos - numpy.array(player.lastPosition, dtype=float), move - playerMove, radius + player.radius, False) <= 1
+        if (touching & hostile).any(): # Ru roh
+            player.alive = False
+        toPlayer = numpy.array(player.position, dtype=float) - pos
+        playerDist = numpy.maximum(numpy.sqrt((toPlayer ** 2).sum(1)), 1e-9)
+        pulled = hostile & ~touching & (playerDist <= self.attractRadius[:n] + player.attractRadius)
+        if pulled.any():
+            scale = self.strength[:n][pulled] / (2 * playerDist[pulled] ** 2)
+            force[pulled] += toPlayer[pulled] * scale[:, None]
+        speed += force
+
+        # Things are gonna blow up here
+        boom = ~bounce
+        e1 = c1[boom]
+        e2 = c2[boom]
+        if len(e1) > 0:
+            middle = (touch1[boom] + touch2[boom]) * 0.5 # Make explosion halfway between both
+            alive = numpy.ones(n, dtype=bool)
+            for k in numpy.argsort(hit[boom], kind="stable").tolist(): # Earliest first, each particle only blows up once
+                i = e1[k]
+                j = e2[k]
+                if alive[i] and alive[j]:
+                    alive[i] = False
+                    alive[j] = False
+                    self.explosionMan.addExplosion(middle[k].tolist())
+            self.pack(alive)
+
+        if self.count < self.maxParticles: # Now lets see if we can ressurect a few
+            self.lastSpawn += sec
+            if self.lastSpawn > self.spawnRate and self.spawnParticle(): # Keeps trying each tick if there's no room
+                self.lastSpawn = 0.0
+
+    def pack(self, alive):
+        """
+        Moves the rows still alive to the front and the dead ones straight after them
+        alive = Boolean mask over the current living rows """
+        n = self.count
+        order = numpy.concatenate((numpy.nonzero(alive)[0], numpy.nonzero(~alive)[0]))
+        for array in (self.position, self.lastPosition, self.speed, self.force, self.matter, self.radius,
+                      self.attractRadius, self.strength, self.maxSpeed, self.ids):
+            array[:n] = array[:n][order]
+        self.count = int(alive.sum())
+
+    def draw(self, screen, alpha=1.0, camera=None):
+        view = None
+        if camera is not None:
+            view = camera.view()
+        for x, y, radius, color in self.circles(alpha, view):
+            if camera is not None:
+                x, y = camera.toScreen(x, y)
+            drawCircle(screen, color, (x, y), radius)
+
+    def circles(self, alpha=1.0, view=None):
+        """
+        Returns (x, y, radius, color) for every living particle
+        view = (left, top, right, bot) of the world wanted, None for everything. Anything
+        not touching it is left out """
+        n = self.count
+        drawn = (self.lastPosition[:n] + (self.position[:n] - self.lastPosition[:n]) * alpha).astype(int)
+        radii = self.radius[:n].astype(int)
+        matter = self.matter[:n]
+        if view is not None:
+            left, top, right, bot = view
+            seen = ((drawn[:, 0] + radii > left) & (drawn[:, 0] - radii < right) &
+                    (drawn[:, 1] + radii > top) & (drawn[:, 1] - radii < bot))
+            drawn = drawn[seen]
+            radii = radii[seen]
+            matter = matter[seen]
+            n = len(radii)
+        drawn = drawn.tolist()
+        radii = radii.tolist()
+        matter = matter.tolist()
+        circles = []
+        for i in range(n):
+            if matter[i]:
+                color = self.matColor
+            else:
+                color = self.antiColor
+            circles.append((drawn[i][0], drawn[i][1], radii[i], color))
+        return circles
+
+    def motions(self, view=None):
+        """
+        Returns (lastX, lastY, x, y, radius, color) for every living particle, like Particle.motion()
+        view = (left, top, right, bot) of the world wanted, None for everything """
+        n = self.count
+        position = self.position[:n]
+        last = self.lastPosition[:n]
+        radii = self.radius[:n].astype(int)
+        matter = self.matter[:n]
+        if view is not None:
+            left, top, right, bot = view
+            reach = radii + 1
+            seen = ((position[:, 0] + reach > left) & (position[:, 0] - reach < right) &
+                    (position[:, 1] + reach > top) & (position[:, 1] - reach < bot))
+            position = position[seen]
+            last = last[seen]
+            radii = radii[seen]
+            matter = matter[seen]
+        moves = numpy.hstack((last, position)).tolist()
+        radii = radii.tolist()
+        matter = matter.tolist()
+        motions = []
+        for i in range(len(radii)):
+            if matter[i]:
+                color = self.matColor
+            else:
+                color = self.antiColor
+            lastX, lastY, x, y = moves[i]
+            motions.append((lastX, lastY, x, y, radii[i], color))
+        return motions
@@ -0,0 +1,246 @@
+import time, queue, threading, itertools
+from scheduler import FixedStepScheduler
+from replay import KIND_PRESS, KIND_RELEASE
+
+# Who is busy, for BusyClock
+PHYSICS = 0
+DRAWING = 1
+
+class RenderState:
+    def __init__(self):
+        """
+        Everything needed to draw one tick, copied out of the world so it can be drawn while
+        the world gets on with the next one. Nothing in here is shared with the world """
+        self.ticks = 0 # World ticks when this was filled in
+        self.moving = [] # Particle.motion() of the player then enemies and particles, see World.motions()
+        self.explosions = [] # (x, y, radius, color) of each explosion
+        self.score = 0
+        self.alive = True
+        self.games = 0 # New games started before this tick
+        self.captured = 0.0 # Time the end of the tick was due, for drawing part way to the next one
+
+    def capture(self, world, games, captured, reach=None):
+        """
+        Copies what is needed to draw world
+        reach = (x, y) distance from the player to copy things from, None for everything """
+        view = None
+        if reach is not None:
+            pos = world.player.position
+            view = (pos.x - reach[0], pos.y - reach[1], pos.x + reach[0], pos.y + reach[1])
+        self.ticks = world.ticks
+        self.moving = world.motions(view)
+        self.explosions = world.explosionMan.circles(view)
+        self.score = world.score
+        self.alive = world.player.alive
+        self.games = games
+        self.captured = captured
+
+    def player(self, alpha):
+        """ Returns (x, y) of the player, alpha of the way through the tick """
+        lastX, lastY, x, y = self.moving[0][:4]
+        return (int(lastX + (x - lastX) * alpha), int(lastY + (y - lastY) * alpha))
+
+    def circles(self, alpha=1.0, view=None):
+        """
+        Returns (x, y, radius, color) for the player, enemies and particles alpha of the way
+        through the tick, like World.circles
+        view = (left, top, right, bot) of the world wanted, None for everything """
+        if len(self.moving) == 0:
+            return []
+        x, y = self.player(alpha)
+        circles = [(x, y, self.moving[0][4], self.moving[0][5])] # The camera follows the player so it's always in view
+        add = circles.append
+        if view is None:
+            left = top = float("-inf")
+            right = bot = float("inf")
+        else:
+            left, top, right, bot = view
+        for lastX, lastY, x, y, radius, color in itertools.islice(self.moving, 1, None):
+            x = int(lastX + (x - lastX) * alpha)
+            y = int(lastY + (y - lastY) * alpha)
+            if x + radius > left and x - radius < right and y + radius > top and y - radius < bot:
+                add((x, y, radius, color))
+        return circles
+
+    def explosionCircles(self, view=None):
+        if view is None:
+            return self.explosions
+        left, top, right, bot = view
+        return [(x, y, radius, color) for x, y, radius, color in self.explosions
+                if x + radius > left and x - radius < right and y + radius > top and y - radius < bot]
+
+class BusyClock:
+    def __init__(self, timer=time.perf_counter):
+        """
+        Adds up how long physics and drawing each keep busy and how long they are both
+        busy at the same time, which is the time a pipeline saves over doing them in turn
+        timer = Function returning the current time in seconds """
+        self.timer = timer
+        self.lock = threading.Lock()
+        self.busy = [False, False] # PHYSICS, DRAWING
+        self.busyTime = [0.0, 0.0] # Seconds each has been busy
+        self.overlap = 0.0 # Seconds both have been busy at once
+        self.since = timer()
+        self.frames = 0 # Frames drawn while counting
+
+    def start(self, who):
+        with self.lock:
+            self.tally()
+            self.busy[who] = True
+
+    def stop(self, who):
+        with self.lock:
+            self.tally()
+            self.busy[who] = False
+            if who == DRAWING:
+                self.frames += 1
+
+    def tally(self):
+        now = self.timer()
+        taken = now - self.since
+        self.since = now
+        if self.busy[PHYSICS]:
+            self.busyTime[PHYSICS] += taken
+        if self.busy[DRAWING]:
+            self.busyTime[DRAWING] += taken
+            if self.busy[PHYSICS]:
+                self.overlap += taken
+
+    def report(self):
+        """ Returns a line saying how long a frame spent on each and how much of that overlapped """
+        frames = max(self.frames, 1)
+        physics = self.busyTime[PHYSICS] * 1000 / frames
+        drawing = self.busyTime[DRAWING] * 1000 / frames
+        overlap = self.overlap * 1000 / frames
+        return "Physics %.2fms + drawing %.2fms a frame, %.2fms (%.0f%%) of it at the same time" % (
+            physics, drawing, overlap, overlap * 100 / max(physics + drawing, 1e-9))
+
+class Pipeline:
+    def __init__(self, world, stepTime, maxSteps, reach=None, recorder=None, clock=None, timer=time.perf_counter):
+        """
+        Runs the world's physics on a thread of its own so the next tick is worked out while
+        the last one is drawn. SDL wants drawing and events on the main thread, so that keeps
+        them and the physics moves instead. After each tick the physics fills in a back
+        RenderState and swaps it with the front one; the main thread takes the front one to
+        draw, swapping it with the one it drew last, so neither waits for the other and
+        nothing is drawn half updated. Input goes the other way through a queue
+        world = World to run, nothing else should touch it once start() is called
+        stepTime, maxSteps = Settings for the physics thread's FixedStepScheduler
+        reach = (x, y) distance from the player worth drawing, None for everything. A screen
+        size each way covers whatever the camera shows
+        recorder = replay.Recorder, the physics thread records its own frames and input
+        clock = BusyClock to count physics time on
+        timer = Function returning the current time in seconds """
+        self.world = world
+        self.scheduler = FixedStepScheduler(stepTime, 1.0 / stepTime, maxSteps, timer) # Wakes once a step
+        self.recorder = recorder
+        self.clock = clock
+        self.timer = timer
+        self.reach = reach
+        self.inputs = queue.Queue() # (KIND_PRESS or KIND_RELEASE, action)
+        self.lock = threading.Lock() # Guards swapping states and the counts below
+        self.back = RenderState() # Being filled in by the physics thread
+        self.front = RenderState() # Newest finished tick
+        self.drawing = RenderState() # Being drawn by the main thread
+        self.fresh = False # front is newer than drawing
+        self.steps = 0 # Steps run since the last take()
+        self.stepTime = 0.0 # Seconds spent running them
+        self.games = 0 # New games started by input
+        self.error = None # Exception that stopped the physics thread
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.front.capture(self.world, self.games, self.timer(), self.reach)
+        self.fresh = True
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="physics")
+        self.thread.daemon = True # Don't hold the process open if the main thread dies
+        self.thread.start()
+
+    def stop(self):
+        """ Waits for the physics thread to finish the frame it is on """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def press(self, action):
+        self.inputs.put((KIND_PRESS, action))
+
+    def release(self, action):
+        self.inputs.put((KIND_RELEASE, action))
+
+    def run(self):
+        try:
+            while self.running:
+                self.frame()
+        except Exception as error:
+            self.error = error
+            raise
+
+    def frame(self):
+        """
+        Runs on the physics thread: input, then any steps due, then publishes the result """
+        world = self.world
+        scheduler = self.scheduler
+        frameTime = scheduler.wait()
+        if not self.running:
+            return # Stopped while waiting, leave the recording on the last whole frame
+        if self.clock is not None:
+            self.clock.start(PHYSICS)
+        if self.recorder is not None:
+            self.recorder.frame(frameTime)
+        handled = 0
+        while True:
+            try:
+                kind, action = self.inputs.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
+            if kind == KIND_PRESS:
+                if self.recorder is not None:
+                    self.recorder.press(action)
+                if world.press(action):
+                    self.games += 1
+            else:
+                if self.recorder is not None:
+                    self.recorder.release(action)
+                world.release(action)
+        start = self.timer()
+        steps = world.stepFrame(scheduler, frameTime)
+        end = self.timer()
+        if steps == 0 and handled == 0:
+            if self.clock is not None:
+                self.clock.stop(PHYSICS)
+            return # Nothing new to draw, eg after game over
+        self.back.capture(world, self.games, end - scheduler.accumulator, self.reach)
+        with self.lock:
+            self.back, self.front = self.front, self.back
+            self.fresh = True
+            self.steps += steps
+            self.stepTime += end - start
+        if self.clock is not None:
+            self.clock.stop(PHYSICS)
+
+    def take(self):
+        """
+        Returns (state, steps, stepTime), the newest finished RenderState and the steps run
+        since the last call and seconds spent on them. The state is the main thread's until
+        the next call
+        Raises whatever stopped the physics thread """
+        if self.error is not None:
+            raise self.error
+        with self.lock:
+            if self.fresh:
+                self.drawing, self.front = self.front, self.drawing
+                self.fresh = False
+            steps = self.steps
+            stepTime = self.stepTime
+            self.steps = 0
+            self.stepTime = 0.0
+        return self.drawing, steps, stepTime
+
+    def alpha(self, state):
+        """ Returns how far to draw state between its tick and the next, from 0 to 1 """
+        return max(min((self.timer() - state.captured) / self.scheduler.stepTime, 1.0), 0.0)
@@ -0,0 +1,122 @@
+import collections
+import pygame
+from settings import *
+from resources import circleImage
+from camera import Camera
+
+class SpriteCache:
+    def __init__(self, colorkey, maxSize=0, step=1):
+        """
+        Keeps one pre drawn circle image for each (radius, color) so circles only get drawn once
+        colorkey = Colorkey used for the transparent corners
+        maxSize = Most images to keep, least recently used are thrown out first. 0 keeps everything
+        step = Radii are rounded down to a multiple of this before looking them up """
+        self.colorkey = colorkey
+        self.maxSize = maxSize
+        self.step = step
+        self.images = collections.OrderedDict() # (radius, color) -> image
+
+    def get(self, radius, color):
+        """
+        Returns the image of a circle with this radius and color, drawing it if needed """
+        if self.step > 1:
+            radius -= radius % self.step
+        key = (radius, color)
+        image = self.images.get(key)
+        if image is None:
+            image = circleImage(radius, color, self.colorkey)
+            self.images[key] = image
+            if self.maxSize > 0 and len(self.images) > self.maxSize:
+                self.images.popitem(last=False) # Throw out the oldest
+        elif self.maxSize > 0:
+            self.images.move_to_end(key) # Recently used so keep it
+        return image
+
+class Renderer:
+    def __init__(self, screen, camera=None, background=(0,0,0), colorkey=COLORKEY, explosionCacheSize=EXPLOSION_SPRITE_CACHE, maxRects=DIRTY_RECT_LIMIT):
+        """
+        Draws the part of the world the camera sees with cached circle images and only
+        pushes the parts of the screen that changed to the display
+        screen = Display surface to draw on
+        camera = Camera following the player, None if the world is the same size as the screen
+        background = Color behind everything
+        colorkey = Colorkey for the circle images
+        explosionCacheSize = Most explosion images to keep, they change size every step
+        maxRects = Past this many changed areas just update the whole screen """
+        self.screen = screen
+        self.screenRect = screen.get_rect()
+        if camera is None:
+            camera = Camera(self.screenRect.width, self.screenRect.height, self.screenRect.width, self.screenRect.height)
+        self.camera = camera
+        self.background = background
+        self.maxRects = maxRects
+        self.sprites = SpriteCache(colorkey) # Particles, enemies and the player only come in a few sizes
+        self.explosionSprites = SpriteCache(colorkey, explosionCacheSize, EXPLOSION_RADIUS_STEP)
+        self.lastRects = [] # Areas drawn last frame which need clearing
+        self.rects = [] # Areas drawn this frame
+        self.full = True # Next present has to update the whole screen
+
+    def invalidate(self):
+        """
+        Makes the next frame clear and update the whole screen, eg after a reset """
+        self.full = True
+
+    def clear(self):
+        """
+        Paints the background over everything drawn last frame """
+        if self.full:
+            self.screen.fill(self.background)
+        else:
+            fill = self.screen.fill
+            for rect in self.lastRects:
+                fill(self.background, rect)
+
+    def drawWorld(self, world, alpha=1.0):
+        """
+        Moves the camera to the player then draws explosions, the player, enemies and
+        particles like World.draw. Anything off screen is skipped before it gets this far """
+        view = self.follow(world.player.circle(alpha))
+        self.drawCircles(world.explosionMan.circles(view), world.circles(alpha, view))
+
+    def drawState(self, state, alpha=1.0):
+        """
+        Draws a pipeline.RenderState the same way drawWorld() draws the world """
+        view = self.follow(state.player(alpha))
+        self.drawCircles(state.explosionCircles(view), state.circles(alpha, view))
+
+    def follow(self, player):
+        """ Centres the camera on the player's (x, y, ...), returns the view of the world """
+        self.camera.follow(player[0], player[1])
+        return self.camera.view()
+
+    def drawCircles(self, explosions, circles):
+        """
+        Draws explosion circles then other circles, both as (x, y, radius, color) in the world """
+        left = self.camera.left
+        top = self.camera.top
+        blits = []
+        for x, y, radius, color in explosions:
+            if radius > 0:
+                image = self.explosionSprites.get(radius, color)
+                half = image.get_width() // 2 # Its radius, which the cache may have rounded down
+                blits.append((image, (x - half - left, y - half - top)))
+        for x, y, radius, color in circles:
+            blits.append((self.sprites.get(radius, color), (x - radius - left, y - radius - top)))
+        self.rects.extend(self.screen.blits(blits))
+
+    def blit(self, image, pos):
+        """
+        Draws image with its top left at pos on the screen, unless none of it would show """
+        if self.screenRect.colliderect(image.get_rect(topleft=(pos[0], pos[1]))):
+            self.rects.append(self.screen.blit(image, pos))
+
+    def present(self):
+        """
+        Pushes everything that changed since last frame to the display """
+        if self.full or len(self.rects) + len(self.lastRects) > self.maxRects:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.lastRects + self.rects)
+        self.full = False
+        self.lastRects = self.rects
+        self.rects = []
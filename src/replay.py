@@ -0,0 +1,150 @@
+import ast, time, struct, argparse
+import instrument
+from settings import *
+from world import World
+from scheduler import FixedStepScheduler
+
+# A log is a header, the settings changed for the world, then a stream of records, each one
+# starting with its kind. Frames are written as they start and any input during a frame
+# follows its frame record
+MAGIC = b"AMRL"
+VERSION = 2
+HEADER = struct.Struct("<4sHqdiI") # magic, version, seed, stepTime, maxSteps, length of the settings
+KIND = struct.Struct("<B")
+FRAME = struct.Struct("<d") # Seconds since the last frame started
+INPUT = struct.Struct("<Bd") # action, seconds since recording started
+
+KIND_FRAME = 0
+KIND_PRESS = 1
+KIND_RELEASE = 2
+KIND_QUIT = 3 # The window was closed part way through the last frame
+
+class Recorder:
+    def __init__(self, path, seed, stepTime, maxSteps, overrides=None, timer=time.perf_counter):
+        """
+        Writes everything needed to play a session again to a log file as it happens
+        path = File to write the log to
+        seed = Seed the world was made with
+        stepTime, maxSteps = Settings of the FixedStepScheduler used
+        overrides = Dict of settings the world was made with, see World. Saved with repr() so
+        the values must be plain Python literals
+        timer = Function returning the current time in seconds """
+        settings = repr(dict(overrides or {})).encode("utf-8")
+        self.out = open(path, "wb")
+        self.out.write(HEADER.pack(MAGIC, VERSION, seed, stepTime, maxSteps, len(settings)) + settings)
+        self.timer = timer
+        self.origin = timer()
+        self.frames = 0
+
+    def frame(self, frameTime):
+        """ Call at the start of each frame, before its input """
+        self.out.write(KIND.pack(KIND_FRAME) + FRAME.pack(frameTime))
+        self.frames += 1
+        if self.frames % 60 == 0: # Keep most of it if we crash
+            self.out.flush()
+
+    def press(self, action):
+        self.out.write(KIND.pack(KIND_PRESS) + INPUT.pack(action, self.timer() - self.origin))
+
+    def release(self, action):
+        self.out.write(KIND.pack(KIND_RELEASE) + INPUT.pack(action, self.timer() - self.origin))
+
+    def quit(self):
+        """ Call if the game quits part way through a frame, before its steps have run """
+        self.out.write(KIND.pack(KIND_QUIT))
+
+    def close(self):
+        self.out.close()
+
+def readLog(path):
+    """
+    Reads a log written by a Recorder
+    Returns (seed, stepTime, maxSteps, frames, overrides), frames is a list of
+    (frameTime, [(kind, action, time) for each input during the frame]).
+    A frame the game quit during ends with a (KIND_QUIT, None, None) input.
+    overrides is the dict of settings the world was made with """
+    data = open(path, "rb").read()
+    if data[:4] != MAGIC:
+        raise ValueError("Not an input log")
+    magic, version = struct.unpack_from("<4sH", data, 0)
+    if version != VERSION:
+        raise ValueError("Input log is version %d, expected %d" % (version, VERSION))
+    magic, version, seed, stepTime, maxSteps, length = HEADER.unpack_from(data, 0)
+    offset = HEADER.size
+    overrides = ast.literal_eval(data[offset:offset + length].decode("utf-8"))
+    offset += length
+    frames = []
+    end = len(data)
+    while offset < end:
+        kind = data[offset]
+        offset += KIND.size
+        if kind == KIND_FRAME:
+            if offset + FRAME.size > end:
+                break # Cut off part way through, the game must have crashed
+            frames.append((FRAME.unpack_from(data, offset)[0], []))
+            offset += FRAME.size
+        elif kind == KIND_PRESS or kind == KIND_RELEASE:
+            if offset + INPUT.size > end:
+                break
+            action, when = INPUT.unpack_from(data, offset)
+            if len(frames) > 0:
+                frames[-1][1].append((kind, action, when))
+            offset += INPUT.size
+        elif kind == KIND_QUIT:
+            if len(frames) > 0:
+                frames[-1][1].append((kind, None, None))
+            break
+        else:
+            raise ValueError("Bad record kind %d at byte %d" % (kind, offset - KIND.size))
+    return seed, stepTime, maxSteps, frames, overrides
+
+def replay(path, inst=instrument.NULL):
+    """
+    Plays a logged session again with no display, as fast as it will go. It goes through
+    the same World calls as the game so it ends up in exactly the same state
+    inst = Instrument to time each phase with
+    Returns the world and a list of (seconds to simulate, frame number, steps) for each frame """
+    seed, stepTime, maxSteps, frames, overrides = readLog(path)
+    world = World(seed, overrides)
+    world.instrument = inst
+    scheduler = FixedStepScheduler(stepTime, 0, maxSteps)
+    costs = []
+    for number in range(len(frames)):
+        frameTime, inputs = frames[number]
+        start = time.perf_counter()
+        steps = 0
+        for kind, action, when in inputs:
+            if kind == KIND_PRESS:
+                world.press(action)
+            elif kind == KIND_RELEASE:
+                world.release(action)
+            else:
+                break
+        else: # Didn't quit
+            steps = world.stepFrame(scheduler, frameTime)
+        costs.append((time.perf_counter() - start, number, steps))
+    return world, costs
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Plays back a session recorded with Game.py --record")
+    parser.add_argument("log", help="Input log to play back")
+    parser.add_argument("--slowest", type=int, default=10, help="Number of slowest frames to list")
+    instrument.addArguments(parser)
+    options = parser.parse_args(args)
+    inst = instrument.fromOptions(options)
+
+    def run():
+        start = time.time()
+        world, costs = replay(options.log, inst)
+        taken = time.time() - start
+        played = sum([frameTime for frameTime, inputs in readLog(options.log)[3]]) # How long the session really took
+        print("Replayed %d frames (%.1fs of play) in %.2fs, %.0fx real time" % (len(costs), played, taken, played / max(taken, 1e-9)))
+        print("Score: %d Alive: %s Time: %.2fs" % (world.score, world.player.alive, world.time))
+        print("Slowest frames:")
+        for cost, number, steps in sorted(costs, reverse=True)[:options.slowest]:
+            print("  frame %6d %8.3fms %d step(s)" % (number, cost * 1000, steps))
+
+    instrument.runWithOptions(run, inst, options)
+
+if __name__ == '__main__':
+    main()
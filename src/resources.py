@@ -0,0 +1,42 @@
+import os
+import pygame
+from pygame.locals import *
+
+def prepareImage(image, colorkey):
+    """
+    Converts an image to the display format and sets its colorkey so it is drawn quickly """
+    image = image.convert() # Set the image to the same format as dispaly so it is drawn quickly
+    image.set_colorkey(colorkey, RLEACCEL)
+    return image
+
+images = {} # (name, colorkey) -> image, see getImage()
+
+def getImage(name, colorkey):
+    """
+    Returns the image from the res folder with this name, it is only loaded the first time it is asked for """
+    image = images.get((name, colorkey))
+    if image is None:
+        image = images[(name, colorkey)] = loadImage(name, colorkey)
+    return image
+
+def loadImage(name, colorkey):
+    """
+    Loads an image from the res folder with the specified name and with the specified colorkey """
+    
+    fullname = os.path.join('res', name) # Create full name of file so it includes the res folder
+    try:
+        image = pygame.image.load(fullname) # Try and load the image
+    except pygame.error as message:
+        print("Cannot load image " + name)
+        raise SystemExit(message) # If it can't load image, gtfo
+    
+    return prepareImage(image, colorkey)
+
+def circleImage(radius, color, colorkey):
+    """
+    Makes a colorkeyed image of a filled circle, centred on (radius, radius) """
+    size = radius * 2 + 1
+    image = pygame.Surface((size, size))
+    image.fill(colorkey)
+    pygame.draw.circle(image, color, (radius, radius), radius)
+    return prepareImage(image, colorkey)
@@ -0,0 +1,64 @@
+import time
+
+class FixedStepScheduler:
+    def __init__(self, stepTime, renderRate=0, maxSteps=5, timer=time.perf_counter, sleep=time.sleep):
+        """
+        Runs physics in fixed size steps no matter how fast frames are drawn, so the
+        game plays the same on every machine
+        stepTime = Seconds of game time in each physics step
+        renderRate = Most frames to draw per second, 0 for no limit
+        maxSteps = Most physics steps to catch up on in one frame, anything past that is dropped
+        timer = Function returning the current time in seconds
+        sleep = Function to wait a number of seconds with """
+        self.stepTime = stepTime
+        self.renderRate = renderRate
+        self.maxSteps = maxSteps
+        self.timer = timer
+        self.sleep = sleep
+        self.accumulator = 0.0 # Time waiting to be simulated
+        self.dropped = 0.0 # Total time thrown away because we were too far behind
+        self.lastFrame = None # When the last frame started
+
+    def wait(self):
+        """
+        Sleeps until the next frame is due if there is a frame cap
+        Returns the seconds since the last frame started """
+        now = self.timer()
+        if self.lastFrame is None:
+            self.lastFrame = now
+            return 0.0
+        if self.renderRate > 0:
+            due = self.lastFrame + 1.0 / self.renderRate
+            if now < due:
+                self.sleep(due - now) # Give the CPU back instead of spinning
+                now = self.timer()
+        frameTime = now - self.lastFrame
+        self.lastFrame = now
+        return frameTime
+
+    def advance(self, frameTime):
+        """
+        Adds frameTime seconds to the accumulator
+        Returns the number of fixed steps that should be run now """
+        self.accumulator += frameTime
+        steps = int(self.accumulator / self.stepTime)
+        if steps > self.maxSteps: # Too far behind, drop the extra time rather than spiral
+            steps = self.maxSteps
+            extra = self.accumulator - steps * self.stepTime
+            keep = extra % self.stepTime
+            self.dropped += extra - keep
+            self.accumulator = steps * self.stepTime + keep
+        self.accumulator -= steps * self.stepTime
+        return steps
+
+    def alpha(self):
+        """
+        Returns how far between the last step and the next one we are, from 0 to 1,
+        for drawing things part way between their old and new positions """
+        return self.accumulator / self.stepTime
+
+    def reset(self):
+        """
+        Forgets any time waiting to be simulated, eg after a pause """
+        self.accumulator = 0.0
+        self.lastFrame = None
@@ -0,0 +1,270 @@
+import sys, ast, time, random, socket, selectors, argparse
+import net
+from settings import *
+from world import World, MOVES, ACTION_RESET
+from scheduler import FixedStepScheduler
+from replay import Recorder, KIND_PRESS, KIND_RELEASE
+
+class Connection:
+    def __init__(self, sock, address):
+        """
+        One client of the server
+        sock = Its socket, non blocking
+        address = Where it connected from """
+        self.sock = sock
+        self.address = address
+        self.reader = net.MessageReader(net.INPUT.size) # Clients only send input
+        self.out = bytearray() # Bytes waiting for the socket to take them
+        self.synced = False # Has been sent a keyframe, so deltas make sense to it
+        self.held = set() # Moves it is holding down, let go of if it leaves
+        self.sent = 0 # Bytes sent to it
+
+class Server:
+    def __init__(self, world, host=SERVER_HOST, port=SERVER_PORT, stepTime=1.0 / PHYSICS_RATE, maxSteps=MAX_CATCHUP_STEPS,
+                 recorder=None, backlog=NET_BACKLOG, timer=time.perf_counter):
+        """
+        Runs world with no window at a fixed tick, takes input from any number of clients
+        over TCP and sends them all each frame. Everything happens on one thread: waiting
+        for the next tick is spent on the sockets
+        world = World to run, the server decides everything that happens in it
+        host, port = Where to listen, port 0 picks a free one, see address
+        stepTime, maxSteps = Settings for the FixedStepScheduler
+        recorder = replay.Recorder to log frames and input to, None for no log
+        backlog = Most bytes to queue for a client before skipping it ahead to a keyframe
+        timer = Function returning the current time in seconds """
+        self.world = world
+        self.recorder = recorder
+        self.backlog = backlog
+        self.timer = timer
+        self.selector = selectors.DefaultSelector()
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(64)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, None)
+        self.address = self.listener.getsockname()
+        self.scheduler = FixedStepScheduler(stepTime, 1.0 / stepTime, maxSteps, timer, self.poll) # Wakes once a step
+        quantum = net.quantumFor(world, world.settings.NET_QUANTUM)
+        self.encoder = net.FrameEncoder(quantum)
+        self.hello = net.message(net.MSG_HELLO, net.hello(world, stepTime, quantum))
+        self.clients = []
+        self.inputs = [] # (connection, kind, action) read since the last frame
+        self.games = 0 # New games started by input
+        self.frames = 0
+        self.stepTime = 0.0 # Seconds spent stepping the world
+        self.encodeTime = 0.0 # Seconds spent turning it into frames
+        self.bytesSent = 0
+        self.keyframes = 0 # Keyframes sent, one per client joining plus one per skip
+        self.skipped = 0 # Times a client fell too far behind and was skipped ahead
+        self.started = None
+
+    def poll(self, seconds):
+        """
+        Handles the sockets for seconds, at least once even if seconds is 0 """
+        deadline = self.timer() + seconds
+        while True:
+            for key, events in self.selector.select(max(deadline - self.timer(), 0)):
+                conn = key.data
+                if conn is None:
+                    self.accept()
+                    continue
+                if events & selectors.EVENT_READ:
+                    self.read(conn)
+                if events & selectors.EVENT_WRITE and conn in self.clients:
+                    self.write(conn)
+            if self.timer() >= deadline:
+                break
+
+    def accept(self):
+        try:
+            sock, address = self.listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Frames are small and late ones are useless
+        conn = Connection(sock, address)
+        self.clients.append(conn)
+        self.selector.register(sock, selectors.EVENT_READ, conn)
+        self.send(conn, self.hello) # Keyframe follows with the next frame
+
+    def read(self, conn):
+        try:
+            data = conn.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if len(data) == 0:
+            self.close(conn)
+            return
+        try:
+            messages = conn.reader.feed(data)
+        except ValueError:
+            self.close(conn) # Not a client of ours
+            return
+        for kind, payload in messages:
+            if kind != net.MSG_INPUT or len(payload) != net.INPUT.size:
+                self.close(conn)
+                return
+            kind, action = net.INPUT.unpack(payload)
+            if kind in (KIND_PRESS, KIND_RELEASE) and 0 <= action <= ACTION_RESET:
+                self.inputs.append((conn, kind, action))
+
+    def send(self, conn, data):
+        conn.out += data
+        self.write(conn)
+
+    def write(self, conn):
+        """ Sends as much of what is waiting as the socket will take """
+        try:
+            sent = conn.sock.send(conn.out)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self.close(conn)
+            return
+        del conn.out[:sent]
+        conn.sent += sent
+        self.bytesSent += sent
+        events = selectors.EVENT_READ
+        if len(conn.out) > 0:
+            events |= selectors.EVENT_WRITE # Tell us when there's room for the rest
+        if self.selector.get_key(conn.sock).events != events:
+            self.selector.modify(conn.sock, events, conn)
+
+    def close(self, conn):
+        if conn not in self.clients:
+            return
+        self.clients.remove(conn)
+        self.selector.unregister(conn.sock)
+        conn.sock.close()
+        for action in conn.held: # Don't leave the player running off in whatever direction it was holding
+            self.inputs.append((None, KIND_RELEASE, action))
+        conn.held = set()
+
+    def applyInput(self):
+        """
+        Hands the input read since the last frame to the world, in the order it came in """
+        world = self.world
+        recorder = self.recorder
+        for conn, kind, action in self.inputs:
+            if conn is not None and conn not in self.clients:
+                continue # Left since, its held moves have already been let go of
+            if kind == KIND_PRESS:
+                if action in MOVES:
+                    if conn is None or action in conn.held or not world.player.alive:
+                        continue # Key repeat, or it would never be let go of
+                    conn.held.add(action)
+                if recorder is not None:
+                    recorder.press(action)
+                if world.press(action):
+                    self.games += 1
+                    for other in self.clients: # The new game starts with nobody moving
+                        other.held.clear()
+            else:
+                if conn is not None:
+                    if action not in conn.held:
+                        continue
+                    conn.held.discard(action)
+                if recorder is not None:
+                    recorder.release(action)
+                world.release(action)
+        self.inputs = []
+
+    def frame(self):
+        """
+        Waits for the next tick, then applies input, steps the world and sends every client the result """
+        scheduler = self.scheduler
+        frameTime = scheduler.wait() # Spends the wait on the sockets
+        self.poll(0)
+        if self.started is None:
+            self.started = self.timer()
+        if self.recorder is not None:
+            self.recorder.frame(frameTime)
+        self.applyInput()
+        start = self.timer()
+        self.world.stepFrame(scheduler, frameTime)
+        stepped = self.timer()
+        encoder = self.encoder
+        encoder.capture(self.world, self.games, time.time())
+        delta = net.message(net.MSG_DELTA, encoder.delta())
+        keyframe = None
+        for conn in list(self.clients):
+            if conn.synced and len(conn.out) > self.backlog:
+                conn.synced = False # Deltas would pile up forever, send it a keyframe once it has caught up
+                self.skipped += 1
+            if conn.synced:
+                self.send(conn, delta)
+            elif len(conn.out) <= self.backlog:
+                if keyframe is None:
+                    keyframe = net.message(net.MSG_KEYFRAME, encoder.keyframe())
+                conn.synced = True
+                self.keyframes += 1
+                self.send(conn, keyframe)
+        self.stepTime += stepped - start
+        self.encodeTime += self.timer() - stepped
+        self.frames += 1
+
+    def run(self, maxFrames=0):
+        """
+        maxFrames = Stop after this many frames, 0 to keep going """
+        while maxFrames == 0 or self.frames < maxFrames:
+            self.frame()
+
+    def report(self):
+        """ Returns a line of how the server has done so far """
+        frames = max(self.frames, 1)
+        seconds = max(self.timer() - (self.started or self.timer()), 1e-9)
+        return ("Served %d frames to %d client(s): step %.2fms encode %.2fms a frame, sent %.1f KiB/s, %d keyframes, %d skips" %
+                (self.frames, len(self.clients), self.stepTime * 1000 / frames, self.encodeTime * 1000 / frames,
+                 self.bytesSent / 1024.0 / seconds, self.keyframes, self.skipped))
+
+    def shutdown(self):
+        for conn in list(self.clients):
+            self.close(conn)
+        self.selector.unregister(self.listener)
+        self.listener.close()
+        self.selector.close()
+
+def parseSetting(text):
+    """ Turns NAME=VALUE into ("NAME", value) """
+    name, value = text.split("=", 1)
+    return (name, ast.literal_eval(value))
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs the game with no window for client.py to connect to")
+    parser.add_argument("--host", default=SERVER_HOST, help="Address to listen on")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Port to listen on, 0 for any free one")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="Setting to change, can be given more than once")
+    parser.add_argument("--frames", type=int, default=0, help="Stop after this many frames, 0 to keep going")
+    parser.add_argument("--record", metavar="FILE", help="Record input and frame times to FILE to play back with replay.py")
+    options = parser.parse_args(args)
+
+    seed = options.seed
+    if seed is None:
+        seed = random.randrange(1 << 31)
+    overrides = dict(parseSetting(text) for text in options.set)
+    world = World(seed, overrides)
+    s = world.settings # --set can change these too
+    stepTime = 1.0 / s.PHYSICS_RATE
+    recorder = None
+    if options.record:
+        recorder = Recorder(options.record, seed, stepTime, s.MAX_CATCHUP_STEPS, overrides)
+    server = Server(world, options.host, options.port, stepTime, s.MAX_CATCHUP_STEPS, recorder, s.NET_BACKLOG)
+    print("Listening on %s:%d" % server.address)
+    sys.stdout.flush() # Whoever started us may be waiting for the port
+    try:
+        server.run(options.frames)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.report())
+        server.shutdown()
+        if recorder is not None:
+            recorder.close()
+            print("Input saved to " + options.record)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+WINDOW_WIDTH = 600
+WINDOW_HEIGHT = 600
+COLORKEY = (255,0,255)
+WORLD_WIDTH = 600 # Size of the arena, the screen scrolls around it if it's bigger than the window
+WORLD_HEIGHT = 600
+FAR_STEP = 1 # Particles off screen and further than FAR_MARGIN only move every this many steps, 1 moves everything every step
+FAR_MARGIN = 200 # Distance past the edge of the screen that still moves every step
+
+PHYSICS_RATE = 50 # Physics steps per second, the same on every machine
+RENDER_FPS = 60 # Most frames to draw per second, 0 for no limit
+MAX_CATCHUP_STEPS = 5 # Most physics steps to run in one frame when behind
+PIPELINED = False # Run physics on a thread of its own while drawing, see pipeline.py
+DIRTY_RECT_LIMIT = 400 # Past this many changed areas a frame, update the whole screen
+
+PLAYER_RADIUS = 13
+PLAYER_ATTRACTRADIUS = 100
+PLAYER_FORCE = 200
+PLAYER_MAXSPEED = 200
+PLAYER_ACCELERATION = 600
+PLAYER_FRICTION = 200
+
+MAX_PARTICLES = 20
+MAT_COLOR = (255,0,0)
+ANTI_COLOR = (0,255,0)
+PARTICLE_RADIUS = 10
+PARTICLE_MAXSPEED = 250
+PARTICLE_ATTRACTRADIUS = 20
+PARTICLE_FORCE = 10
+PARTICLE_SPAWNRATE = 5
+PARTICLE_SPATIALHASH = True # False to fall back to checking every pair
+PARTICLE_SLEEP = True # Stop updating particles that have stopped with nothing near them
+PARTICLE_SLEEPSPEED = 1.0 # Particles slower than this can go to sleep
+PARTICLE_SLEEPCHECK = 5 # Ticks between looking for particles to put to sleep
+PARTICLE_BACKEND = "objects" # "numpy" keeps all particles in arrays, needs numpy
+SPAWN_TRIES = 20 # Random spots to try once there are no fully free cells left
+SPAWN_SAMPLES = 10 # Random spots to try before mapping out the free cells of the whole arena
+
+MAX_ENEMIES = 10
+ENEMY_COLOR = (100, 20, 250)
+ENEMY_RADIUS = 5
+ENEMY_SPAWNRATE = 5
+
+EXPLOSION_MAXTIME = 2
+EXPLOSION_GROWTHRATE = 30
+EXPLOSION_COLOR = (255,82,30)
+EXPLOSION_SPRITE_CACHE = 64 # Explosion images to keep drawn
+EXPLOSION_RADIUS_STEP = 1 # Explosion images are made every this many pixels of radius
+
+TEXT_COLOR = (255,255,255)
+SCORE_POSITION = (25,25)
+SHOW_STATS = True # Show frames per second and physics time under the score
+STATS_POSITION = (25,55)
+STATS_INTERVAL = 0.5 # Seconds between stats updates
+
+SERVER_HOST = "127.0.0.1" # Where server.py listens and client.py connects to
+SERVER_PORT = 7350
+NET_QUANTUM = 4 # Positions are sent in 1/this pixels, fewer if the world is too big for 16 bits
+NET_BACKLOG = 256 * 1024 # Most bytes queued for a slow client before it is skipped ahead to a keyframe
+
+class Settings:
+    def __init__(self, overrides=None):
+        """
+        A copy of the settings above with some of them changed, so one world can be
+        tuned without touching any other
+        overrides = Dict of setting name to new value """
+        for name, value in globals().items():
+            if name.isupper():
+                setattr(self, name, value)
+        if overrides:
+            for name, value in overrides.items():
+                if not name.isupper() or not hasattr(self, name):
+                    raise KeyError("Unknown setting " + name)
+                setattr(self, name, value)
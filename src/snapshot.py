@@ -0,0 +1,159 @@
+import struct
+from entities import Explosion
+
+# Snapshots are little endian and laid out as: header, random number state, player,
+# particle manager, enemy manager, explosions. Everything in them is plain numbers
+# so a saved snapshot can be loaded into any World made with the same settings
+MAGIC = b"AMSN"
+VERSION = 3
+HEADER = struct.Struct("<4sHiId") # magic, version, score, ticks, time
+RANDOM = struct.Struct("<i625I?d") # random.Random state: version, Mersenne Twister words, has gauss, gauss
+PLAYER = struct.Struct("<8d??") # position, lastPosition, speed, direction, matter, alive
+KIND = struct.Struct("<B") # Which sort of manager follows
+OBJECTS = struct.Struct("<dIIIII") # lastSpawn, farTick, sleepTicks, particles, alive, dead
+ARRAYS = struct.Struct("<dII") # lastSpawn, rows, living rows
+EXPLOSIONS = struct.Struct("<II") # started, active
+
+KIND_OBJECTS = 0 # ParticleManager and EnemyManager
+KIND_ARRAYS = 1 # particlearrays.ArrayParticleManager
+
+def save(world):
+    """
+    Returns the whole state of world as bytes """
+    chunks = [HEADER.pack(MAGIC, VERSION, world.score, world.ticks, world.time)]
+    version, words, gauss = world.rng.getstate()
+    chunks.append(RANDOM.pack(version, *(words + (gauss is not None, gauss or 0.0))))
+    p = world.player
+    chunks.append(PLAYER.pack(p.position.x, p.position.y, p.lastPosition.x, p.lastPosition.y,
+                              p.speed.x, p.speed.y, p.direction[0], p.direction[1], p.matter, p.alive))
+    saveManager(world.particleMan, chunks)
+    saveManager(world.enemyMan, chunks)
+    man = world.explosionMan
+    chunks.append(EXPLOSIONS.pack(man.started, len(man.active)))
+    values = []
+    for expl in man.active:
+        values.extend((expl.position.x, expl.position.y, expl.radius, expl.aliveTime))
+    chunks.append(struct.pack("<%dd" % len(values), *values))
+    return b"".join(chunks)
+
+def saveManager(man, chunks):
+    if not hasattr(man, "aliveList"): # Array backend, its living rows are always the first count rows
+        n = man.count
+        chunks.append(KIND.pack(KIND_ARRAYS))
+        chunks.append(ARRAYS.pack(man.lastSpawn, man.maxParticles, n))
+        for array in (man.position, man.lastPosition, man.speed):
+            chunks.append(array[:n].astype("<f8").tobytes())
+        chunks.append(man.matter.astype("?").tobytes())
+        return
+    parts = man.particles
+    index = dict((id(part), i) for i, part in enumerate(parts))
+    alive = [index[id(part)] for part in man.aliveList]
+    dead = [index[id(part)] for part in man.deadList]
+    chunks.append(KIND.pack(KIND_OBJECTS))
+    chunks.append(OBJECTS.pack(man.lastSpawn, man.farTick, man.sleepTicks, len(parts), len(alive), len(dead)))
+    chunks.append(struct.pack("<%dI%dI" % (len(alive), len(dead)), *(alive + dead)))
+    values = []
+    for part in parts:
+        values.extend((part.position.x, part.position.y, part.lastPosition.x, part.lastPosition.y, part.speed.x, part.speed.y, part.behind))
+    flags = [part.matter for part in parts] + [part.asleep for part in parts]
+    chunks.append(struct.pack("<%dd%d?" % (len(values), len(flags)), *(values + flags)))
+
+def load(world, data, restoreRandom=True):
+    """
+    Puts world back to the state saved in data, reusing the objects it already has
+    restoreRandom = Also put the random numbers back, False to let them carry on
+    Raises ValueError if data isn't a snapshot or was saved from a world with different settings """
+    if data[:4] != MAGIC:
+        raise ValueError("Not a world snapshot")
+    magic, version, score, ticks, time = HEADER.unpack_from(data, 0)
+    if version != VERSION:
+        raise ValueError("Snapshot is version %d, expected %d" % (version, VERSION))
+    offset = HEADER.size
+    if restoreRandom:
+        values = RANDOM.unpack_from(data, offset)
+        gauss = None
+        if values[-2]:
+            gauss = values[-1]
+        world.rng.setstate((values[0], values[1:-2], gauss))
+    offset += RANDOM.size
+
+    values = PLAYER.unpack_from(data, offset)
+    offset += PLAYER.size
+    p = world.player
+    p.position.set(values[0], values[1])
+    p.lastPosition.set(values[2], values[3])
+    p.speed.set(values[4], values[5])
+    p.direction[0], p.direction[1] = values[6:8]
+    p.matter, p.alive = values[8:10] # Color goes with matter
+
+    offset = loadManager(world.particleMan, data, offset)
+    offset = loadManager(world.enemyMan, data, offset)
+
+    man = world.explosionMan
+    man.started, active = EXPLOSIONS.unpack_from(data, offset)
+    offset += EXPLOSIONS.size
+    values = struct.unpack_from("<%dd" % (active * 4), data, offset)
+    man.free.extend(man.active) # Reuse whatever is going off now
+    man.explosions.clear()
+    for i in range(0, len(values), 4):
+        if len(man.free) > 0:
+            expl = man.free.pop()
+        else:
+            expl = Explosion(man.kind, (0.0, 0.0))
+        expl.position.set(values[i], values[i + 1])
+        expl.radius = values[i + 2]
+        expl.aliveTime = values[i + 3]
+        man.explosions.add(expl)
+
+    world.score = score
+    world.ticks = ticks
+    world.time = time
+
+def loadManager(man, data, offset):
+    """ Returns the offset just past this manager """
+    kind = KIND.unpack_from(data, offset)[0]
+    offset += KIND.size
+    if kind == KIND_ARRAYS:
+        if hasattr(man, "aliveList"):
+            raise ValueError("Snapshot is of the numpy particle backend")
+        lastSpawn, rows, n = ARRAYS.unpack_from(data, offset)
+        if rows != man.maxParticles:
+            raise ValueError("Snapshot has %d particles, world has %d" % (rows, man.maxParticles))
+        offset += ARRAYS.size
+        import numpy # Only here if the world already uses it
+        for array in (man.position, man.lastPosition, man.speed):
+            array[:n] = numpy.frombuffer(data, "<f8", n * 2, offset).reshape((n, 2))
+            offset += n * 16
+        man.matter[:] = numpy.frombuffer(data, "?", rows, offset)
+        offset += rows
+        man.count = n
+        man.ids[:n] = numpy.arange(man.nextId, man.nextId + n) # New particles as far as anyone watching is concerned
+        man.nextId += n
+        man.lastSpawn = lastSpawn
+        return offset
+
+    if not hasattr(man, "aliveList"):
+        raise ValueError("Snapshot is of the objects particle backend")
+    lastSpawn, farTick, sleepTicks, count, alive, dead = OBJECTS.unpack_from(data, offset)
+    parts = man.particles
+    if count != len(parts):
+        raise ValueError("Snapshot has %d particles, world has %d" % (count, len(parts)))
+    offset += OBJECTS.size
+    indices = struct.unpack_from("<%dI" % (alive + dead), data, offset)
+    offset += 4 * (alive + dead)
+    values = struct.unpack_from("<%dd%d?" % (count * 7, count * 2), data, offset)
+    offset += count * 7 * 8 + count * 2
+    for i in range(count):
+        part = parts[i]
+        v = i * 7
+        part.position.set(values[v], values[v + 1])
+        part.lastPosition.set(values[v + 2], values[v + 3])
+        part.speed.set(values[v + 4], values[v + 5])
+        part.behind = values[v + 6]
+        part.matter = values[count * 7 + i]
+        part.asleep = values[count * 8 + i]
+    man.setAlive([parts[i] for i in indices[:alive]], [parts[i] for i in indices[alive:]]) # Also puts the sleepers back
+    man.lastSpawn = lastSpawn
+    man.farTick = farTick
+    man.sleepTicks = sleepTicks
+    return offset
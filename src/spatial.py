@@ -0,0 +1,211 @@
+import math
+
+class SpatialHash:
+    def __init__(self, cellSize):
+        """
+        Uniform grid used as a broad phase for circle checks. Each item is put in the
+        bucket its centre falls in, so a query only has to look at nearby buckets
+        cellSize = Width and height of each cell """
+        self.cellSize = float(max(cellSize, 1))
+        self.cells = {} # (cellx, celly) -> list of indices in that cell
+
+    def clear(self):
+        self.cells = {}
+
+    def cellOf(self, pos):
+        """ Returns the (x, y) cell containing pos """
+        return (int(math.floor(pos[0] / self.cellSize)), int(math.floor(pos[1] / self.cellSize)))
+
+    def insert(self, index, pos):
+        self.insertAt(index, pos[0], pos[1])
+
+    def insertAt(self, index, x, y):
+        """ Same as insert() with the position given as numbers, quicker for Vec2s """
+        cell = (int(math.floor(x / self.cellSize)), int(math.floor(y / self.cellSize)))
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            self.cells[cell] = [index]
+        else:
+            bucket.append(index)
+
+    def remove(self, index, pos):
+        """ Takes index back out, pos must be where it was inserted """
+        cell = self.cellOf(pos)
+        bucket = self.cells[cell]
+        bucket.remove(index)
+        if len(bucket) == 0:
+            del self.cells[cell]
+
+    def near(self, x, y, reach):
+        """
+        Returns everything in the cells within reach of (x, y), in no particular order. Unlike
+        query() what was inserted doesn't have to be an index """
+        size = self.cellSize
+        x0 = int(math.floor((x - reach) / size))
+        x1 = int(math.floor((x + reach) / size))
+        y0 = int(math.floor((y - reach) / size))
+        y1 = int(math.floor((y + reach) / size))
+        found = []
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    found.extend(bucket)
+        return found
+
+    def build(self, particles):
+        """ Clears the grid and inserts every particle under its list index """
+        self.cells = {}
+        for i in range(len(particles)):
+            self.insert(i, particles[i].position)
+
+    def query(self, positions, reach, minIndex=-1):
+        """
+        Returns the indices greater than minIndex of everything that could be within
+        reach of any of the given positions, in ascending order so callers see the
+        same pair order as a brute force loop """
+        left = min([p[0] for p in positions]) - reach
+        right = max([p[0] for p in positions]) + reach
+        top = min([p[1] for p in positions]) - reach
+        bot = max([p[1] for p in positions]) + reach
+        return self.queryBox(left, top, right, bot, minIndex)
+
+    def queryBox(self, left, top, right, bot, minIndex=-1):
+        """
+        Same as query() for everything that could be inside the box """
+        size = self.cellSize
+        x0 = int(math.floor(left / size))
+        x1 = int(math.floor(right / size))
+        y0 = int(math.floor(top / size))
+        y1 = int(math.floor(bot / size))
+
+        found = []
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    for index in bucket:
+                        if index > minIndex:
+                            found.append(index)
+        found.sort()
+        return found
+
+class SpawnGrid:
+    def __init__(self, left, top, right, bot, cellSize, rng):
+        """
+        Occupancy grid over the whole numbers in [left, right] x [top, bot] used to find
+        free spots to spawn in without endlessly guessing. A cell is free when nothing
+        blocks any point in it, so any point picked in a free cell is fine. Mapping out the
+        cells costs time in proportion to the area, so it is only done once a few random
+        spots have been tried and turned out to be blocked
+        cellSize = Width and height of each cell, a whole number
+        rng = Random number generator to pick spots with """
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bot = bot
+        self.cellSize = max(int(cellSize), 1)
+        self.rng = rng
+        self.columns = max((right - left) // self.cellSize + 1, 0)
+        self.rows = max((bot - top) // self.cellSize + 1, 0)
+        self.free = None # Cells nothing is near yet, made by build()
+        self.where = None # Index of each cell in free, -1 if blocked
+        self.blockers = SpatialHash(self.cellSize * 4) # Everything blocking, for checking exact spots
+        self.blockerList = [] # (position, reach) of everything blocking
+        self.wide = [] # Blockers reaching further than a hash cell, checked one by one
+        self.maxReach = 0 # Of the ones in the hash
+        self.retries = 0 # Random spots tried that were blocked
+
+    def cellBounds(self, cell):
+        """ Returns (x0, y0, x1, y1), the first and last whole numbers inside the cell """
+        x0 = self.left + (cell % self.columns) * self.cellSize
+        y0 = self.top + (cell // self.columns) * self.cellSize
+        return (x0, y0, min(x0 + self.cellSize - 1, self.right), min(y0 + self.cellSize - 1, self.bot))
+
+    def block(self, pos, reach):
+        """
+        Marks everything within reach of pos as taken (a spot exactly reach away is taken too) """
+        pos = (pos[0], pos[1]) # Own copy, pos may be a Vec2 that keeps moving
+        if reach > self.blockers.cellSize:
+            self.wide.append((pos, reach))
+        else:
+            self.blockers.insert(len(self.blockerList), pos)
+            self.blockerList.append((pos, reach))
+            if reach > self.maxReach:
+                self.maxReach = reach
+        if self.free is not None:
+            self.blockCells(pos[0], pos[1], reach)
+
+    def build(self):
+        """ Maps out which cells are free of everything blocked so far """
+        self.free = list(range(self.columns * self.rows))
+        self.where = list(range(self.columns * self.rows))
+        for pos, reach in self.wide:
+            self.blockCells(pos[0], pos[1], reach)
+        for pos, reach in self.blockerList:
+            self.blockCells(pos[0], pos[1], reach)
+
+    def blockCells(self, x, y, reach):
+        size = self.cellSize
+        cx0 = max(int(math.floor((x - reach - self.left) / size)), 0)
+        cx1 = min(int(math.floor((x + reach - self.left) / size)), self.columns - 1)
+        cy0 = max(int(math.floor((y - reach - self.top) / size)), 0)
+        cy1 = min(int(math.floor((y + reach - self.top) / size)), self.rows - 1)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                cell = cy * self.columns + cx
+                if self.where[cell] < 0:
+                    continue # Already taken
+                x0, y0, x1, y1 = self.cellBounds(cell)
+                dx = max(x0 - x, 0, x - x1) # Closest the cell gets to pos
+                dy = max(y0 - y, 0, y - y1)
+                if dx * dx + dy * dy <= reach * reach:
+                    self.removeFree(cell)
+
+    def removeFree(self, cell):
+        index = self.where[cell]
+        last = self.free.pop()
+        if last != cell: # Swap the last free cell into the gap
+            self.free[index] = last
+            self.where[last] = index
+        self.where[cell] = -1
+
+    def isClear(self, pos):
+        """ Returns True if nothing blocks this exact spot """
+        for other, reach in self.wide:
+            if (other[0] - pos[0]) ** 2 + (other[1] - pos[1]) ** 2 <= reach * reach:
+                return False
+        for i in self.blockers.near(pos[0], pos[1], self.maxReach):
+            other, reach = self.blockerList[i]
+            if (other[0] - pos[0]) ** 2 + (other[1] - pos[1]) ** 2 <= reach * reach:
+                return False
+        return True
+
+    def find(self, tries, samples=0):
+        """
+        Returns a free [x, y] spot, or None if there doesn't seem to be room.
+        Tries samples random spots first, then picks from the free cells, then tries up
+        to tries random spots in case there is room left in a partly blocked cell
+        samples = Random spots to try before mapping out the free cells, that only has
+        to be done once the arena is getting full """
+        rng = self.rng
+        if self.right < self.left or self.bot < self.top:
+            return None
+        if self.free is None:
+            for i in range(samples):
+                pos = [rng.randint(self.left, self.right), rng.randint(self.top, self.bot)]
+                if self.isClear(pos):
+                    return pos
+                self.retries += 1
+            self.build()
+        if len(self.free) > 0:
+            x0, y0, x1, y1 = self.cellBounds(self.free[rng.randrange(len(self.free))])
+            return [rng.randint(x0, x1), rng.randint(y0, y1)]
+        for i in range(tries):
+            self.retries += 1
+            pos = [rng.randint(self.left, self.right), rng.randint(self.top, self.bot)]
+            if self.isClear(pos):
+                return pos
+        return None
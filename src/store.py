@@ -0,0 +1,163 @@
+INDEX_BITS = 20 # Low bits of a handle are the slot, the rest are its generation
+INDEX_MASK = (1 << INDEX_BITS) - 1
+
+class EntityStore:
+    def __init__(self):
+        """
+        Live entities packed into one list so removing any of them is O(1): the last one
+        is swapped into its place. Entities move around when that happens so they are found
+        again through handles rather than indices. A handle is a slot number plus how many
+        times that slot has been used, so a handle to something already removed is spotted
+        rather than finding whatever took its place.
+        Kills and spawns can be put off until flush(), eg while looping over the entities """
+        self.items = [] # Live entities in no particular order, only ever changed in place
+        self.handles = [] # Handle of each entity in items
+        self.dense = [] # slot -> index in items, -1 when the slot is free
+        self.generations = [] # slot -> times it has been used
+        self.freeSlots = [] # Slots waiting to be reused
+        self.dying = [] # Handles to remove at the next flush(), in the order they were killed
+        self.dyingSet = set() # The same handles, so killing twice only removes once
+        self.spawning = [] # Entities to add at the next flush()
+        self.spawningIds = set() # id() of each of those
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item):
+        """ Adds item straight away, returns its handle """
+        if len(self.freeSlots) > 0:
+            slot = self.freeSlots.pop()
+        else:
+            slot = len(self.dense)
+            self.dense.append(-1)
+            self.generations.append(0)
+        handle = slot | (self.generations[slot] << INDEX_BITS)
+        self.dense[slot] = len(self.items)
+        self.items.append(item)
+        self.handles.append(handle)
+        return handle
+
+    def indexOf(self, handle):
+        """ Returns where the entity is in items, -1 if the handle is stale """
+        slot = handle & INDEX_MASK
+        if slot >= len(self.dense) or self.generations[slot] != handle >> INDEX_BITS:
+            return -1
+        return self.dense[slot]
+
+    def get(self, handle):
+        """ Returns the entity, None if it has been removed since the handle was given out """
+        index = self.indexOf(handle)
+        if index < 0:
+            return None
+        return self.items[index]
+
+    def removeAt(self, index):
+        """
+        Removes the entity at index by moving the last one into its place
+        Returns the entity removed """
+        items = self.items
+        handles = self.handles
+        slot = handles[index] & INDEX_MASK
+        item = items[index]
+        last = len(items) - 1
+        if index != last:
+            items[index] = items[last]
+            handles[index] = handles[last]
+            self.dense[handles[index] & INDEX_MASK] = index
+        items.pop()
+        handles.pop()
+        self.dense[slot] = -1
+        self.generations[slot] += 1 # Any handle still out there is now stale
+        self.freeSlots.append(slot)
+        return item
+
+    def swap(self, i, j):
+        """ Swaps the entities at indices i and j, their handles still find them """
+        items = self.items
+        handles = self.handles
+        items[i], items[j] = items[j], items[i]
+        handles[i], handles[j] = handles[j], handles[i]
+        self.dense[handles[i] & INDEX_MASK] = i
+        self.dense[handles[j] & INDEX_MASK] = j
+
+    def remove(self, handle):
+        """ Returns the entity removed, None if the handle was stale """
+        index = self.indexOf(handle)
+        if index < 0:
+            return None
+        return self.removeAt(index)
+
+    def kill(self, handle):
+        """ Removes the entity at the next flush(), killing it again before then does nothing """
+        if handle not in self.dyingSet:
+            self.dyingSet.add(handle)
+            self.dying.append(handle)
+
+    def killAt(self, index):
+        self.kill(self.handles[index])
+
+    def isDying(self, handle):
+        return handle in self.dyingSet
+
+    def spawn(self, item):
+        """ Adds item at the next flush(), spawning it again before then does nothing """
+        if id(item) not in self.spawningIds:
+            self.spawningIds.add(id(item))
+            self.spawning.append(item)
+
+    def flush(self):
+        """
+        Removes everything killed then adds everything spawned since the last flush
+        Returns the entities removed, in the order they were killed """
+        removed = []
+        if len(self.dying) * 4 > len(self.items): # Lots going at once, one pass over everything beats swapping each out
+            removed = self.compact()
+        elif len(self.dying) > 0:
+            for handle in self.dying:
+                item = self.remove(handle)
+                if item is not None:
+                    removed.append(item)
+        self.dying = []
+        self.dyingSet.clear()
+        if len(self.spawning) > 0:
+            for item in self.spawning:
+                self.add(item)
+            self.spawning = []
+            self.spawningIds.clear()
+        return removed
+
+    def compact(self):
+        """
+        Removes everything killed keeping the rest in order, returns what was removed """
+        items = self.items
+        dense = self.dense
+        removed = []
+        gone = [False] * len(items)
+        for handle in self.dying:
+            index = self.indexOf(handle)
+            if index >= 0:
+                gone[index] = True
+                removed.append(items[index])
+                slot = handle & INDEX_MASK
+                dense[slot] = -1
+                self.generations[slot] += 1
+                self.freeSlots.append(slot)
+        items[:] = [items[i] for i in range(len(items)) if not gone[i]]
+        self.handles[:] = [self.handles[i] for i in range(len(gone)) if not gone[i]]
+        for i, handle in enumerate(self.handles):
+            dense[handle & INDEX_MASK] = i
+        return removed
+
+    def clear(self):
+        """ Removes everything, pending kills and spawns included """
+        for handle in self.handles:
+            slot = handle & INDEX_MASK
+            self.dense[slot] = -1
+            self.generations[slot] += 1
+            self.freeSlots.append(slot)
+        del self.items[:]
+        del self.handles[:]
+        self.dying = []
+        self.dyingSet.clear()
+        self.spawning = []
+        self.spawningIds.clear()
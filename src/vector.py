@@ -1,13 +1,118 @@
+import sys
+from math import fabs
+
+class Vec2(object):
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x=0.0, y=0.0):
+        """ 2D vector with no per instance dict. Can be indexed like a [x, y] list """
+        self.x = x
+        self.y = y
+
+    def __getitem__(self, i):
+        if i == 0 or i == -2:
+            return self.x
+        if i == 1 or i == -1:
+            return self.y
+        raise IndexError("Vec2 index out of range")
+
+    def __setitem__(self, i, value):
+        if i == 0 or i == -2:
+            self.x = value
+        elif i == 1 or i == -1:
+            self.y = value
+        else:
+            raise IndexError("Vec2 index out of range")
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+    def __eq__(self, other):
+        return self.x == other[0] and self.y == other[1]
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None # Mutable so can't be a dict key
+
+    def __repr__(self):
+        return "Vec2(%r, %r)" % (self.x, self.y)
+
+    def __add__(self, other):
+        return Vec2(self.x + other[0], self.y + other[1])
+
+    def __sub__(self, other):
+        return Vec2(self.x - other[0], self.y - other[1])
+
+    def __mul__(self, f):
+        """ Scales by a number, or multiplies each component if given a vector """
+        if isinstance(f, (int, float)):
+            return Vec2(self.x * f, self.y * f)
+        return Vec2(self.x * f[0], self.y * f[1])
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Vec2(-self.x, -self.y)
+
+    def __iadd__(self, other):
+        self.x += other[0]
+        self.y += other[1]
+        return self
+
+    def __isub__(self, other):
+        self.x -= other[0]
+        self.y -= other[1]
+        return self
+
+    def __imul__(self, f):
+        if isinstance(f, (int, float)):
+            self.x *= f
+            self.y *= f
+        else:
+            self.x *= f[0]
+            self.y *= f[1]
+        return self
+
+    def set(self, x, y):
+        self.x = x
+        self.y = y
+        return self
+
+    def copy(self):
+        return Vec2(self.x, self.y)
+
+    def dot(self, other):
+        return self.x * other[0] + self.y * other[1]
+
+    def length(self):
+        return (self.x * self.x + self.y * self.y) ** 0.5
+
+    def normalise(self):
+        """ Makes this a unit vector in place """
+        dist = (self.x * self.x + self.y * self.y) ** 0.5
+        self.x /= dist
+        self.y /= dist
+        return self
+
 def add(v1, v2):
-    """ Adds 2 vectors of the same size 
+    """ Adds 2 vectors of the same size
     v1 and v2 should be lists """
+    if len(v1) == 2:
+        return [v1[0] + v2[0], v1[1] + v2[1]]
     return [v1[i] + v2[i] for i in range (len(v1))] # TODO: add size exception
 
 def subtract(v1,v2):
     """ Adds 2 vectors of the same size
     v1 and v2 should be lists """
+    if len(v1) == 2:
+        return [v1[0] - v2[0], v1[1] - v2[1]]
     return [v1[i] - v2[i] for i in range (len(v1))]
-    
+
 def unit(v1):
     """ Returns the unit vector of v1
     v1 2D a array as a list """
@@ -17,19 +122,100 @@ def unit(v1):
 def multiply(v1, v2):
     """ Multiplies the 2 vectors together
     v1 and v2 should be lists """
+    if len(v1) == 2:
+        return [v1[0] * v2[0], v1[1] * v2[1]]
     return [v1[i] * v2[i] for i in range(len(v1))]
 
 def scale(v1, f1):
     """ Multiplies all values in v1 by f1 """
+    if len(v1) == 2:
+        return [v1[0] * f1, v1[1] * f1]
     return [v1[i] * f1 for i in range(len(v1))]
 
 def dot(v1, v2):
     """ Returns the dot product of v1 and v2
     v1 and v2 should be lists """
-    v3 = multiply(v1,v2) # Multiply the components
-    return sum(v3)  # Return the sum of the components
+    if len(v1) == 2:
+        return v1[0] * v2[0] + v1[1] * v2[1]
+    return sum([v1[i] * v2[i] for i in range(len(v1))]) # Sum of the multiplied components
 
 def absAdd(v1,v2):
     """ Adds the absolute values of v1 and v2 """
-    from math import fabs
-    return [fabs(v1[i]) + fabs(v2[i]) for i in range (len(v1))]
\ No newline at end of file
+    if len(v1) == 2:
+        return [fabs(v1[0]) + fabs(v2[0]), fabs(v1[1]) + fabs(v2[1])]
+    return [fabs(v1[i]) + fabs(v2[i]) for i in range (len(v1))]
+
+# Batch versions, these work on a whole (n, 2) numpy array of vectors at once, or on
+# lists of Vec2 one at a time. Where there is an out it can be one of the inputs to work in place
+
+def arrayModule(vs):
+    """
+    Returns numpy if vs is a numpy array, None if not. numpy is slow to import so this never
+    imports it, if nothing else has there can't be any arrays """
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(vs, numpy.ndarray):
+        return numpy
+    return None
+
+def addAll(vs, ws, out=None):
+    """ Adds each vector in ws to the matching one in vs """
+    numpy = arrayModule(vs)
+    if numpy is not None:
+        return numpy.add(vs, ws, out=out)
+    if out is None:
+        return [v + w for v, w in zip(vs, ws)]
+    for i in range(len(vs)):
+        out[i].set(vs[i][0] + ws[i][0], vs[i][1] + ws[i][1])
+    return out
+
+def subtractAll(vs, ws, out=None):
+    """ Takes each vector in ws away from the matching one in vs """
+    numpy = arrayModule(vs)
+    if numpy is not None:
+        return numpy.subtract(vs, ws, out=out)
+    if out is None:
+        return [v - w for v, w in zip(vs, ws)]
+    for i in range(len(vs)):
+        out[i].set(vs[i][0] - ws[i][0], vs[i][1] - ws[i][1])
+    return out
+
+def scaleAll(vs, f, out=None):
+    """ Multiplies every vector in vs by f """
+    numpy = arrayModule(vs)
+    if numpy is not None:
+        return numpy.multiply(vs, f, out=out)
+    if out is None:
+        return [v * f for v in vs]
+    for i in range(len(vs)):
+        out[i].set(vs[i][0] * f, vs[i][1] * f)
+    return out
+
+def multiplyAll(vs, ws, out=None):
+    """ Multiplies each vector in vs by the matching one in ws, component by component """
+    numpy = arrayModule(vs)
+    if numpy is not None:
+        return numpy.multiply(vs, ws, out=out)
+    if out is None:
+        return [v * w for v, w in zip(vs, ws)]
+    for i in range(len(vs)):
+        out[i].set(vs[i][0] * ws[i][0], vs[i][1] * ws[i][1])
+    return out
+
+def unitAll(vs, out=None):
+    """ Unit vector of each vector in vs """
+    numpy = arrayModule(vs)
+    if numpy is not None:
+        dist = numpy.sqrt((vs * vs).sum(1))[:, None]
+        return numpy.divide(vs, dist, out=out)
+    if out is None:
+        return [v.copy().normalise() for v in vs]
+    for i in range(len(vs)):
+        out[i].set(vs[i][0], vs[i][1]).normalise()
+    return out
+
+def dotAll(vs, ws):
+    """ Dot product of each pair of matching vectors """
+    numpy = arrayModule(vs)
+    if numpy is not None:
+        return (vs * ws).sum(1)
+    return [v[0] * w[0] + v[1] * w[1] for v, w in zip(vs, ws)]
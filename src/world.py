@@ -0,0 +1,233 @@
+import random, time, argparse
+import instrument, snapshot
+from settings import *
+from entities import *
+
+# Things the player can do, input of any sort gets turned into these
+ACTION_UP = 0
+ACTION_DOWN = 1
+ACTION_LEFT = 2
+ACTION_RIGHT = 3
+ACTION_FLIP = 4
+ACTION_RESET = 5
+MOVES = {ACTION_UP: (1, -1), ACTION_DOWN: (1, 1), ACTION_LEFT: (0, -1), ACTION_RIGHT: (0, 1)} # action -> (axis, direction)
+
+class World:
+    def __init__(self, seed=None, overrides=None):
+        """
+        Everything that makes up one game, without a window or fonts so it can be
+        stepped on its own
+        seed = Seed for this world's random numbers, None to seed from the system
+        overrides = Dict of settings to change for this world only, eg {"PARTICLE_FORCE": 20} """
+        self.settings = Settings(overrides)
+        self.rng = random.Random(seed)
+        self.instrument = instrument.NULL # Swap for an instrument.Instrument to time each phase
+        self.initial = None # Snapshot of a new game for reset() to go back to
+        self.reset()
+
+    def reset(self):
+        """
+        Puts everything back to how a new game starts. Only the first call makes anything,
+        after that the new game snapshot is loaded back into the same objects. Random numbers
+        carry on rather than going back so each game after the start still plays differently """
+        if self.initial is not None:
+            snapshot.load(self, self.initial, False)
+            return
+        s = self.settings
+        self.explosionMan = ExplosionManager(s.EXPLOSION_MAXTIME, s.EXPLOSION_GROWTHRATE, s.EXPLOSION_COLOR)
+        self.player = Player(s.PLAYER_RADIUS , None, s.PLAYER_ATTRACTRADIUS, s.PLAYER_FORCE, s.PLAYER_MAXSPEED, s.PLAYER_ACCELERATION, s.PLAYER_FRICTION, s.WORLD_WIDTH, s.WORLD_HEIGHT, s.MAT_COLOR, s.ANTI_COLOR)
+        self.particleMan = self.createParticleManager()
+        self.particleMan.spawnAll()
+        self.enemyMan = EnemyManager(s.MAX_ENEMIES, s.ENEMY_COLOR, s.ENEMY_RADIUS, s.ENEMY_SPAWNRATE, self.player, self.explosionMan, s.WORLD_WIDTH, s.WORLD_HEIGHT, self.rng)
+        self.enemyMan.spawnSamples = s.SPAWN_SAMPLES
+        self.enemyMan.spawnTries = s.SPAWN_TRIES
+        self.enemyMan.spawnAll()
+        self.score = 0
+        self.ticks = 0 # Number of steps taken this game
+        self.time = 0.0 # Seconds simulated this game
+        self.initial = snapshot.save(self)
+
+    def save(self):
+        """
+        Returns a snapshot of the whole game as bytes, see snapshot.py """
+        return snapshot.save(self)
+
+    def load(self, data, restoreRandom=True):
+        """
+        Carries on from a snapshot made by save(), the world must have the same settings
+        restoreRandom = False to keep this world's random numbers, eg to fork different runs from one snapshot """
+        snapshot.load(self, data, restoreRandom)
+
+    def createParticleManager(self):
+        """
+        Makes a particle manager using the backend chosen by PARTICLE_BACKEND """
+        s = self.settings
+        if s.PARTICLE_BACKEND == "numpy":
+            import particlearrays # Only import when asked for so numpy stays optional
+            particleMan = particlearrays.ArrayParticleManager(s.MAX_PARTICLES, s.MAT_COLOR, s.ANTI_COLOR, s.PARTICLE_RADIUS, s.PARTICLE_MAXSPEED, s.PARTICLE_ATTRACTRADIUS, s.PARTICLE_FORCE, self.player, s.PARTICLE_SPAWNRATE, self.explosionMan, s.WORLD_WIDTH, s.WORLD_HEIGHT, self.rng)
+            particleMan.spawnSamples = s.SPAWN_SAMPLES
+            particleMan.spawnTries = s.SPAWN_TRIES
+            return particleMan
+        particleMan = ParticleManager(s.MAX_PARTICLES, s.MAT_COLOR, s.ANTI_COLOR, s.PARTICLE_RADIUS, s.PARTICLE_MAXSPEED, s.PARTICLE_ATTRACTRADIUS, s.PARTICLE_FORCE, self.player, s.PARTICLE_SPAWNRATE, self.explosionMan, s.WORLD_WIDTH, s.WORLD_HEIGHT, self.rng)
+        particleMan.spawnSamples = s.SPAWN_SAMPLES
+        particleMan.spawnTries = s.SPAWN_TRIES
+        particleMan.useSpatialHash = s.PARTICLE_SPATIALHASH
+        particleMan.useSleep = s.PARTICLE_SLEEP
+        particleMan.sleepSpeed = s.PARTICLE_SLEEPSPEED
+        particleMan.sleepCheck = s.PARTICLE_SLEEPCHECK
+        particleMan.farStep = s.FAR_STEP
+        particleMan.nearWidth = s.WINDOW_WIDTH / 2.0 + s.FAR_MARGIN # The camera keeps the player about in the middle of the screen
+        particleMan.nearHeight = s.WINDOW_HEIGHT / 2.0 + s.FAR_MARGIN
+        return particleMan
+
+    def press(self, action):
+        """
+        Starts an action, eg when its key goes down. Once the player is dead only
+        ACTION_FLIP does anything, it starts a new game
+        Returns True if a new game was started """
+        player = self.player
+        if not player.alive:
+            if action == ACTION_FLIP:
+                self.reset()
+                return True
+            return False
+        if action in MOVES:
+            axis, direction = MOVES[action]
+            player.direction[axis] += direction
+        elif action == ACTION_FLIP:
+            player.flipPolarity()
+        elif action == ACTION_RESET:
+            self.reset()
+            return True
+        return False
+
+    def release(self, action):
+        """
+        Stops an action, eg when its key comes back up """
+        if self.player.alive and action in MOVES:
+            axis, direction = MOVES[action]
+            self.player.direction[axis] -= direction
+
+    def stepFrame(self, scheduler, frameTime):
+        """
+        Runs however many fixed steps are due after a frame that took frameTime seconds
+        scheduler = FixedStepScheduler keeping track of the time left over
+        Returns the number of steps run """
+        if not self.player.alive:
+            return 0
+        steps = scheduler.advance(frameTime)
+        for i in range(steps): # Physics always moves in the same sized steps
+            self.step(scheduler.stepTime)
+        return steps
+
+    def step(self, dt):
+        """
+        Moves the game on by dt seconds, nothing happens once the player is dead
+        Returns True while the player is still alive """
+        if self.player.alive:
+            inst = self.instrument
+            start = inst.start()
+            self.player.update(dt)
+            start = inst.stop("player.update", start)
+            self.particleMan.update(dt)
+            start = inst.stop("particleMan.update", start)
+            self.explosionMan.update(dt)
+            start = inst.stop("explosionMan.update", start)
+            self.score += self.enemyMan.update(dt)
+            inst.stop("enemyMan.update", start)
+            if inst.enabled:
+                inst.count("collision pairs", self.particleMan.pairChecks)
+                inst.count("awake particles", self.particleMan.awake)
+                inst.count("spawn retries", self.particleMan.spawnRetries + self.enemyMan.spawnRetries)
+            self.particleMan.pairChecks = 0
+            self.particleMan.spawnRetries = 0
+            self.enemyMan.spawnRetries = 0
+            self.ticks += 1
+            self.time += dt
+        return self.player.alive
+
+    def draw(self, screen, alpha=1.0, camera=None):
+        """
+        alpha = How far between the last step and the next one to draw moving things
+        camera = Camera the screen shows the world through, None if the screen is the whole world """
+        self.explosionMan.draw(screen, alpha, camera)
+        self.player.draw(screen, alpha, camera)
+        self.enemyMan.draw(screen, alpha, camera)
+        self.particleMan.draw(screen, alpha, camera)
+
+    def circles(self, alpha=1.0, view=None):
+        """
+        Returns (x, y, radius, color) for the player, enemies and particles in drawing order.
+        Explosions are left out as they change size every step, see explosionMan.circles()
+        view = (left, top, right, bot) of the world wanted, None for everything """
+        circles = [self.player.circle(alpha)] # The camera follows the player so it's always in view
+        circles.extend(self.enemyMan.circles(alpha, view))
+        circles.extend(self.particleMan.circles(alpha, view))
+        return circles
+
+    def motions(self, view=None):
+        """
+        Returns Particle.motion() for the player, enemies and particles in the same order
+        as circles(), so they can be drawn at any alpha after the world has moved on
+        view = (left, top, right, bot) of the world wanted, None for everything """
+        motions = [self.player.motion()] # Always there, like in circles()
+        motions.extend(self.enemyMan.motions(view))
+        motions.extend(self.particleMan.motions(view))
+        return motions
+
+
+def runHeadless(ticks, dt, seed=None, autoReset=False, inst=instrument.NULL, start=None):
+    """
+    Steps a world ticks times with no display
+    autoReset = Start a new game when the player dies instead of stopping
+    inst = Instrument to time each step with
+    start = Snapshot to carry on from rather than a new game
+    Returns the world, the number of games played and the number of ticks run """
+    world = World(seed)
+    if start is not None:
+        world.load(start)
+    world.instrument = inst
+    games = 1
+    run = 0
+    while run < ticks:
+        run += 1
+        if not world.step(dt):
+            if not autoReset:
+                break
+            world.reset()
+            games += 1
+    return world, games, run
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs the game with no window")
+    parser.add_argument("--ticks", type=int, default=10000, help="Number of steps to run")
+    parser.add_argument("--dt", type=float, default=1.0 / PHYSICS_RATE, help="Seconds per step")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--autoreset", action="store_true", help="Start a new game when the player dies")
+    parser.add_argument("--load", metavar="FILE", help="Carry on from a snapshot instead of a new game")
+    parser.add_argument("--save", metavar="FILE", help="Save a snapshot of the world to FILE when done")
+    instrument.addArguments(parser)
+    options = parser.parse_args(args)
+    inst = instrument.fromOptions(options)
+
+    def run():
+        begin = None
+        if options.load:
+            begin = open(options.load, "rb").read()
+        start = time.time()
+        world, games, run = runHeadless(options.ticks, options.dt, options.seed, options.autoreset, inst, begin)
+        taken = time.time() - start
+        print("Ran %d ticks over %d game(s) in %.2fs (%.0f ticks/sec)" % (run, games, taken, run / max(taken, 1e-9)))
+        print("Score: %d Alive: %s Time: %.2fs" % (world.score, world.player.alive, world.time))
+        if options.save:
+            out = open(options.save, "wb")
+            try:
+                out.write(world.save())
+            finally:
+                out.close()
+            print("Snapshot saved to " + options.save)
+
+    instrument.runWithOptions(run, inst, options)
+
+if __name__ == '__main__':
+    main()